@@ -5,10 +5,172 @@ Handles sound effects and background music for videos.
 
 import os
 import random
+import shutil
+import threading
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
-from pydub import AudioSegment
-from pydub.effects import normalize
+import av
+import numpy as np
+
+
+# Demuxers for known extensions, so opening a file skips format probing
+_AV_FORMATS = {
+    ".mp3": "mp3",
+    ".wav": "wav",
+    ".ogg": "ogg",
+    ".m4a": "mov",
+}
+
+
+def _dir_mtime(path) -> Optional[int]:
+    """Returns a directory's mtime in ns, or None if it doesn't exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _channel_layout(channels: int) -> str:
+    """Returns the libav channel layout name for a channel count."""
+    return "mono" if channels == 1 else "stereo"
+
+
+def _open_av(path: str, format: Optional[str] = None):
+    """
+    Opens an audio file for decoding with a known demuxer.
+
+    The format comes from the argument or the file extension. If it turns
+    out to be wrong, the file is reopened with normal probing.
+    """
+    format = format or _AV_FORMATS.get(os.path.splitext(str(path))[1].lower())
+    if format:
+        try:
+            return av.open(str(path), format=format)
+        except av.FFmpegError:
+            pass
+    return av.open(str(path))
+
+
+def _decode_av(
+    path: str,
+    rate: Optional[int] = None,
+    channels: Optional[int] = None,
+    format: Optional[str] = None
+) -> tuple[np.ndarray, int, int]:
+    """
+    Decodes an audio file to int16 samples in-process with PyAV.
+
+    Args:
+        path: Path to audio file
+        rate: Target sample rate (source rate if None)
+        channels: Target channel count, 1 or 2 (source count if None)
+        format: Container format (from the extension if None)
+
+    Returns:
+        Tuple of (samples shaped (frames, channels), rate, channels)
+    """
+    with _open_av(path, format) as container:
+        stream = container.streams.audio[0]
+        rate = rate or stream.codec_context.sample_rate
+        channels = channels or min(stream.codec_context.channels, 2)
+
+        resampler = av.AudioResampler(
+            format="s16",
+            layout=_channel_layout(channels),
+            rate=rate
+        )
+
+        chunks = []
+        for frame in container.decode(stream):
+            chunks.extend(f.to_ndarray() for f in resampler.resample(frame))
+        chunks.extend(f.to_ndarray() for f in resampler.resample(None))
+
+    if not chunks:
+        return np.zeros((0, channels), dtype=np.int16), rate, channels
+
+    samples = np.concatenate(chunks, axis=1).reshape(-1, channels)
+    return samples, rate, channels
+
+
+@lru_cache(maxsize=64)
+def _load_effect_samples(path: str, rate: int, channels: int) -> np.ndarray:
+    """
+    Decodes a sound effect once per (path, rate, channels).
+
+    The returned array is shared between callers and is read-only.
+    """
+    samples, _, _ = _decode_av(path, rate, channels)
+    samples.flags.writeable = False
+    return samples
+
+
+def _encode_av(samples: np.ndarray, rate: int, path: str) -> None:
+    """
+    Encodes int16 samples shaped (frames, channels) with PyAV.
+
+    A .wav path is written as uncompressed PCM (no codec cost, bit-exact for
+    the next stage); anything else is encoded as MP3. The file is encoded to
+    a temp name and renamed in, so rewriting an input in place never
+    truncates it or writes through a link.
+
+    Args:
+        samples: Audio samples
+        rate: Sample rate
+        path: Output path
+    """
+    layout = _channel_layout(samples.shape[1])
+    is_wav = str(path).lower().endswith(".wav")
+
+    tmp_path = f"{path}.tmp"
+    with av.open(tmp_path, mode="w", format="wav" if is_wav else "mp3") as container:
+        stream = container.add_stream("pcm_s16le" if is_wav else "mp3", rate=rate)
+        stream.layout = layout
+
+        frame = av.AudioFrame.from_ndarray(
+            np.ascontiguousarray(samples).reshape(1, -1),
+            format="s16",
+            layout=layout
+        )
+        frame.sample_rate = rate
+        frame.pts = 0
+
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+
+    os.replace(tmp_path, path)
+
+
+def _peak_normalize(buf: np.ndarray, headroom_db: float = 0.1) -> np.ndarray:
+    """
+    Scales a mix buffer so its peak sits headroom_db below full scale.
+
+    Matches pydub's normalize, but takes the peak from max/min reductions
+    (no np.abs temporary) and applies the gain in place in float32.
+
+    Args:
+        buf: Mixed samples in a wide integer dtype (e.g. int32)
+        headroom_db: Distance of the peak below full scale in dB
+
+    Returns:
+        Normalized int16 samples
+    """
+    if not buf.size:
+        return buf.astype(np.int16)
+
+    peak = max(int(buf.max()), -int(buf.min()))
+    if not peak:
+        return buf.astype(np.int16)
+
+    target = 32768 * 10 ** (-headroom_db / 20)
+    scaled = buf.astype(np.float32)
+    scaled *= np.float32(target / peak)
+    np.clip(scaled, -32768, 32767, out=scaled)
+
+    return scaled.astype(np.int16)
 
 
 class AudioMixer:
@@ -20,6 +182,8 @@ class AudioMixer:
         "turns out", "plot twist", "and then", "suddenly"
     ]
 
+    AUDIO_EXTENSIONS = {'.mp3', '.wav', '.ogg', '.m4a'}
+
     def __init__(
         self,
         sounds_dir: str = "assets/sounds",
@@ -28,6 +192,38 @@ class AudioMixer:
         self.sounds_dir = Path(sounds_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._sfx_index, self._sfx_mtimes = self._scan_sounds()
+        self._sfx_queues: dict[str, deque] = {}
+        # Concurrent pipelines share one mixer; guards the index and queues
+        self._sfx_lock = threading.Lock()
+
+    def _scan_sounds(self) -> tuple[dict[str, list[str]], dict[str, int]]:
+        """
+        Indexes sound files by category folder in a single directory walk.
+
+        Files directly inside the sounds directory are stored under "".
+
+        Returns:
+            Tuple of (index, folder mtimes keyed like the index)
+        """
+        index = {"": []}
+        mtimes = {"": _dir_mtime(self.sounds_dir)}
+        if not self.sounds_dir.is_dir():
+            return index, mtimes
+
+        with os.scandir(self.sounds_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    mtimes[entry.name] = entry.stat().st_mtime_ns
+                    with os.scandir(entry.path) as files:
+                        index[entry.name] = [
+                            f.path for f in files
+                            if os.path.splitext(f.name)[1].lower() in self.AUDIO_EXTENSIONS
+                        ]
+                elif os.path.splitext(entry.name)[1].lower() in self.AUDIO_EXTENSIONS:
+                    index[""].append(entry.path)
+
+        return index, mtimes
 
     def get_sound_effect(self, category: str = "punchline") -> Optional[str]:
         """
@@ -39,21 +235,34 @@ class AudioMixer:
         Returns:
             Path to sound effect file or None
         """
-        category_dir = self.sounds_dir / category
-        if not category_dir.exists():
-            # Try to find any sound file
-            category_dir = self.sounds_dir
-
-        audio_extensions = {'.mp3', '.wav', '.ogg', '.m4a'}
-        sounds = [
-            f for f in category_dir.iterdir()
-            if f.suffix.lower() in audio_extensions
-        ]
-
-        if not sounds:
-            return None
-
-        return str(random.choice(sounds))
+        with self._sfx_lock:
+            # Rescan only if the sounds folder or this category folder changed
+            if (
+                _dir_mtime(self.sounds_dir) != self._sfx_mtimes[""]
+                or (
+                    category in self._sfx_mtimes
+                    and _dir_mtime(self.sounds_dir / category) != self._sfx_mtimes[category]
+                )
+            ):
+                self._sfx_index, self._sfx_mtimes = self._scan_sounds()
+                self._sfx_queues = {}
+
+            if category not in self._sfx_index:
+                # Try to find any sound file
+                category = ""
+
+            sounds = self._sfx_index[category]
+            if not sounds:
+                return None
+
+            # Hand out effects in shuffled rounds so none repeats within a round
+            queue = self._sfx_queues.setdefault(category, deque())
+            if not queue:
+                shuffled = list(sounds)
+                random.shuffle(shuffled)
+                queue.extend(shuffled)
+
+            return queue.popleft()
 
     def add_sound_effect(
         self,
@@ -61,7 +270,8 @@ class AudioMixer:
         effect_path: str,
         position_ms: int,
         effect_volume_db: float = -6.0,
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        format: Optional[str] = None
     ) -> str:
         """
         Adds a sound effect to the main audio at a specific position.
@@ -72,24 +282,21 @@ class AudioMixer:
             position_ms: Position in milliseconds to insert effect
             effect_volume_db: Volume adjustment for effect in dB
             output_path: Output path (overwrites main if None)
+            format: Main audio container format (from the extension if None)
 
         Returns:
             Path to output audio file
         """
-        main_audio = AudioSegment.from_file(main_audio_path)
-        effect = AudioSegment.from_file(effect_path)
+        main_audio, rate, channels = _decode_av(main_audio_path, format=format)
+        effect = _load_effect_samples(str(effect_path), rate, channels)
 
-        # Adjust effect volume
-        effect = effect + effect_volume_db
-
-        # Overlay effect at position
-        combined = main_audio.overlay(effect, position=position_ms)
-
-        # Normalize to prevent clipping
-        combined = normalize(combined)
+        # Overlay effect at position and normalize to prevent clipping
+        combined = self._mix_numpy(
+            main_audio, rate, [(effect, position_ms, effect_volume_db)]
+        )
 
         output = output_path or main_audio_path
-        combined.export(output, format="mp3")
+        _encode_av(combined, rate, output)
 
         return output
 
@@ -100,7 +307,8 @@ class AudioMixer:
         music_volume_db: float = -15.0,
         fade_in_ms: int = 1000,
         fade_out_ms: int = 1000,
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        format: Optional[str] = None
     ) -> str:
         """
         Adds background music to the main audio.
@@ -112,35 +320,27 @@ class AudioMixer:
             fade_in_ms: Fade in duration
             fade_out_ms: Fade out duration
             output_path: Output path
+            format: Main audio container format (from the extension if None)
 
         Returns:
             Path to output audio file
         """
-        main_audio = AudioSegment.from_file(main_audio_path)
-        music = AudioSegment.from_file(music_path)
-
-        # Adjust music volume
-        music = music + music_volume_db
-
-        # Loop music if shorter than main audio
-        if len(music) < len(main_audio):
-            loops_needed = (len(main_audio) // len(music)) + 1
-            music = music * loops_needed
-
-        # Trim music to main audio length
-        music = music[:len(main_audio)]
-
-        # Apply fades
-        music = music.fade_in(fade_in_ms).fade_out(fade_out_ms)
-
-        # Overlay
-        combined = main_audio.overlay(music)
-
-        # Normalize
-        combined = normalize(combined)
+        main_audio, rate, channels = _decode_av(main_audio_path, format=format)
+        music, _, _ = _decode_av(music_path, rate, channels)
+
+        # Loop, fade and overlay music, then normalize
+        combined = self._mix_numpy(
+            main_audio,
+            rate,
+            [],
+            music=music,
+            music_volume_db=music_volume_db,
+            fade_in_ms=fade_in_ms,
+            fade_out_ms=fade_out_ms
+        )
 
         output = output_path or main_audio_path
-        combined.export(output, format="mp3")
+        _encode_av(combined, rate, output)
 
         return output
 
@@ -148,7 +348,8 @@ class AudioMixer:
         self,
         tts_audio_path: str,
         punchline_start_time: float,
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        format: Optional[str] = None
     ) -> str:
         """
         Adds a punchline sound effect at the appropriate time.
@@ -157,6 +358,7 @@ class AudioMixer:
             tts_audio_path: Path to TTS audio
             punchline_start_time: When the punchline starts (seconds)
             output_path: Output path
+            format: TTS audio container format (from the extension if None)
 
         Returns:
             Path to output audio
@@ -175,7 +377,8 @@ class AudioMixer:
             effect_path=effect_path,
             position_ms=max(0, position_ms),
             effect_volume_db=-3.0,
-            output_path=output_path
+            output_path=output_path,
+            format=format
         )
 
     def process_video_audio(
@@ -184,7 +387,8 @@ class AudioMixer:
         punchline_time: Optional[float] = None,
         add_music: bool = False,
         music_path: Optional[str] = None,
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        format: Optional[str] = None
     ) -> str:
         """
         Full audio processing pipeline for video.
@@ -195,34 +399,109 @@ class AudioMixer:
             add_music: Whether to add background music
             music_path: Path to background music
             output_path: Output path
+            format: TTS audio container format (from the extension if None)
 
         Returns:
             Path to processed audio
         """
-        output = output_path or tts_audio_path.replace(".mp3", "_mixed.mp3")
+        # WAV intermediate: the video encoder re-compresses the audio anyway
+        stem, suffix = os.path.splitext(tts_audio_path)
+        output = output_path or stem + "_mixed.wav"
 
-        # Copy original to output
-        audio = AudioSegment.from_file(tts_audio_path)
-        audio.export(output, format="mp3")
-
-        # Add punchline effect
+        effect_path = None
         if punchline_time is not None:
-            self.create_punchline_effect(
-                output,
-                punchline_time,
-                output
-            )
-
-        # Add background music
-        if add_music and music_path and os.path.exists(music_path):
-            self.add_background_music(
-                output,
-                music_path,
-                output_path=output
-            )
+            effect_path = self.get_sound_effect("punchline")
+            if not effect_path:
+                print("Warning: No punchline sound effects found")
+
+        use_music = bool(add_music and music_path and os.path.exists(music_path))
+
+        # Nothing to mix: copy the TTS file instead of re-encoding it
+        if not effect_path and not use_music:
+            # A copy keeps the source container, so it keeps its extension too
+            if output_path is None:
+                output = stem + "_mixed" + suffix
+            if os.path.abspath(output) != os.path.abspath(tts_audio_path):
+                shutil.copyfile(tts_audio_path, output)
+            return output
+
+        # Decode every input once and mix in memory
+        audio, rate, channels = _decode_av(tts_audio_path, format=format)
+
+        effects = []
+        if effect_path:
+            position_ms = max(0, int(punchline_time * 1000) - 100)
+            effect = _load_effect_samples(effect_path, rate, channels)
+            effects.append((effect, position_ms, -3.0))
+
+        music = None
+        if use_music:
+            music, _, _ = _decode_av(music_path, rate, channels)
+
+        audio = self._mix_numpy(audio, rate, effects, music)
+
+        # Single encode at the end
+        _encode_av(audio, rate, output)
 
         return output
 
+    def _mix_numpy(
+        self,
+        main: np.ndarray,
+        rate: int,
+        effects: list[tuple[np.ndarray, int, float]],
+        music: Optional[np.ndarray] = None,
+        music_volume_db: float = -15.0,
+        fade_in_ms: int = 1000,
+        fade_out_ms: int = 1000
+    ) -> np.ndarray:
+        """
+        Mixes effects and background music onto the main audio in one pass.
+
+        All overlays are accumulated into a single int32 buffer, so nothing
+        clips until the final peak normalization. Every input must already
+        share the main audio's sample rate and channel count.
+
+        Args:
+            main: Main audio samples (usually TTS), shaped (frames, channels)
+            rate: Sample rate of all inputs
+            effects: List of (effect_samples, position_ms, gain_db) overlays
+            music: Background music samples, looped to the main audio length
+            music_volume_db: Volume adjustment for music in dB
+            fade_in_ms: Music fade in duration
+            fade_out_ms: Music fade out duration
+
+        Returns:
+            Mixed and normalized int16 samples
+        """
+        buf = main.astype(np.int32)
+        n_frames = len(buf)
+
+        # Overlay effects (truncated at the end of the main audio)
+        for effect, position_ms, gain_db in effects:
+            start = int(position_ms * rate / 1000)
+            samples = effect[:max(0, n_frames - start)]
+            gain = 10 ** (gain_db / 20)
+            target = buf[start:start + len(samples)]
+            np.add(target, samples * np.float32(gain), out=target, casting="unsafe")
+
+        # Loop music to the main length, apply volume and fades
+        if music is not None and len(music):
+            samples = np.resize(music, (n_frames, music.shape[1])).astype(np.float32)
+            samples *= np.float32(10 ** (music_volume_db / 20))
+
+            fade_in = min(n_frames, int(fade_in_ms * rate / 1000))
+            fade_out = min(n_frames, int(fade_out_ms * rate / 1000))
+            if fade_in:
+                samples[:fade_in] *= np.linspace(0, 1, fade_in, dtype=np.float32)[:, None]
+            if fade_out:
+                samples[-fade_out:] *= np.linspace(1, 0, fade_out, dtype=np.float32)[:, None]
+
+            np.add(buf, samples, out=buf, casting="unsafe")
+
+        # Normalize once to prevent clipping
+        return _peak_normalize(buf)
+
 
 def create_default_sound_effects(sounds_dir: str = "assets/sounds"):
     """
@@ -62,33 +62,92 @@ class RedditVideoBot:
             output_dir=str(self.output_dir / "audio")
         )
         self.uploader = YouTubeUploader()
-        self.title_gen = TitleGenerator()
+        self.title_gen = TitleGenerator(
+            session=self.scraper.session,
+            cache_path=str(self.output_dir / "title_cache")
+        )
 
-        # Track generated videos to avoid duplicates
-        self.history_file = self.output_dir / "history.json"
+        # Track generated videos to avoid duplicates (append-only JSONL)
+        self.history_file = self.output_dir / "history.jsonl"
+        self.legacy_history_file = self.output_dir / "history.json"
         self.history = self._load_history()
+        self._generated_set = set(self.history["generated_posts"])
+
+        # Concurrent pipelines share the history and the YouTube client
+        self._history_lock = asyncio.Lock()
+        # googleapiclient/httplib2 is not thread-safe, so one upload at a time
+        self._upload_lock = asyncio.Lock()
+        # Posts picked by pipelines that are still running
+        self._claimed_ids = set()
 
     def _load_history(self) -> dict:
-        """Loads generation history."""
+        """Loads generation history, migrating a legacy history.json once."""
+        history = {"generated_posts": [], "uploaded_videos": []}
+
         if self.history_file.exists():
             with open(self.history_file) as f:
-                return json.load(f)
-        return {"generated_posts": [], "uploaded_videos": []}
-
-    def _save_history(self):
-        """Saves generation history."""
-        with open(self.history_file, "w") as f:
-            json.dump(self.history, f, indent=2)
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partial line from an interrupted write
+                        continue
+
+                    record_type = record.pop("type", None)
+                    if record_type == "generated":
+                        history["generated_posts"].append(record["post_id"])
+                    elif record_type == "uploaded":
+                        history["uploaded_videos"].append(record)
+
+        elif self.legacy_history_file.exists():
+            with open(self.legacy_history_file) as f:
+                legacy = json.load(f)
+
+            records = [
+                {"type": "generated", "post_id": post_id}
+                for post_id in legacy.get("generated_posts", [])
+            ] + [
+                {"type": "uploaded", **video}
+                for video in legacy.get("uploaded_videos", [])
+            ]
+            self._append_history(*records)
+
+            history["generated_posts"] = list(legacy.get("generated_posts", []))
+            history["uploaded_videos"] = list(legacy.get("uploaded_videos", []))
+
+        return history
+
+    def _append_history(self, *records: dict):
+        """Appends records to the history file, one JSON object per line."""
+        with open(self.history_file, "a") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
 
     def _is_already_generated(self, post_id: str) -> bool:
-        """Checks if post was already used."""
-        return post_id in self.history["generated_posts"]
+        """Checks if post was already used or is in progress."""
+        return (
+            post_id in self._claimed_ids
+            or post_id in self._generated_set
+        )
+
+    async def _record_history(self, record: dict):
+        """Records a history event in memory and on disk, one writer at a time."""
+        async with self._history_lock:
+            if record["type"] == "generated":
+                self.history["generated_posts"].append(record["post_id"])
+                self._generated_set.add(record["post_id"])
+            else:
+                self.history["uploaded_videos"].append(
+                    {k: v for k, v in record.items() if k != "type"}
+                )
+            await asyncio.to_thread(self._append_history, record)
 
     async def fetch_joke(self) -> Optional[RedditPost]:
         """Fetches a fresh joke from Reddit."""
         print("📥 Fetching joke from Reddit...")
 
-        joke = self.scraper.get_top_joke(
+        joke = await self.scraper.get_top_joke(
             time_filter="week",  # Look at week for more options
             min_score=50,
             max_length=800,
@@ -102,7 +161,7 @@ class RedditVideoBot:
         # Skip if already generated
         if self._is_already_generated(joke.post_id):
             print(f"⏭️ Skipping already used post: {joke.post_id}")
-            jokes = self.scraper.get_multiple_jokes(count=10)
+            jokes = await self.scraper.get_multiple_jokes(count=10)
             for j in jokes:
                 if not self._is_already_generated(j.post_id):
                     joke = j
@@ -111,6 +170,9 @@ class RedditVideoBot:
                 print("❌ All recent jokes already used")
                 return None
 
+        # Claim it so concurrent pipelines pick a different post
+        self._claimed_ids.add(joke.post_id)
+
         print(f"✅ Found joke from r/{joke.subreddit} (score: {joke.score})")
         return joke
 
@@ -151,13 +213,17 @@ class RedditVideoBot:
         if tts_result.segments:
             sfx_time = tts_result.segments[-1].start_time
 
+        # One Groq call covers the card's username and the upload metadata
+        info = self.title_gen.generate_all(joke.setup, joke.punchline, joke.subreddit)
+
         # Compose video with tweet-style overlay
         video_path = self.composer.compose_video(
             tts_result=tts_result,
             output_filename=f"{joke.post_id}.mp4",
             sound_effect_path=sfx_path,
             sound_effect_time=sfx_time,
-            full_text=joke.full_text
+            display_name=info["display_name"],
+            handle=info["handle"]
         )
 
         print(f"✅ Video generated: {video_path}")
@@ -180,13 +246,11 @@ class RedditVideoBot:
             self.uploader.authenticate()
 
         # Generate title and description using Groq AI
+        # (memoized from generate_video, so usually no extra request)
         print("🤖 Generating title with AI...")
-        title = self.title_gen.generate_title(joke.setup, joke.punchline)
-        description = self.title_gen.generate_description(
-            joke.setup,
-            joke.punchline,
-            joke.subreddit
-        )
+        info = self.title_gen.generate_all(joke.setup, joke.punchline, joke.subreddit)
+        title = info["title"]
+        description = info["description"]
 
         print(f"📝 Title: {title}")
 
@@ -219,50 +283,68 @@ class RedditVideoBot:
         if not joke:
             return None
 
-        print(f"\n📝 Joke:\n{joke.setup}")
-        if joke.punchline:
-            print(f"👉 {joke.punchline}")
-        print()
-
-        # Step 2: Generate audio
-        tts_result = await self.generate_audio(joke)
+        # Release the claim however the run ends; a failed post may be retried
+        try:
+            print(f"\n📝 Joke:\n{joke.setup}")
+            if joke.punchline:
+                print(f"👉 {joke.punchline}")
+            print()
 
-        # Step 3: Generate video
-        video_path = self.generate_video(joke, tts_result)
+            # Step 2: Generate audio
+            tts_result = await self.generate_audio(joke)
 
-        # Track in history
-        self.history["generated_posts"].append(joke.post_id)
-        self._save_history()
+            loop = asyncio.get_running_loop()
 
-        result = {
-            "post_id": joke.post_id,
-            "subreddit": joke.subreddit,
-            "video_path": video_path,
-            "duration": tts_result.total_duration
-        }
+            # Step 3: Generate video (CPU-bound, off the event loop)
+            video_path = await loop.run_in_executor(
+                None, self.generate_video, joke, tts_result
+            )
 
-        # Step 4: Upload (optional)
-        if upload:
-            try:
-                upload_result = self.upload_to_youtube(video_path, joke, privacy)
-                result["youtube_url"] = upload_result["url"]
-                result["youtube_id"] = upload_result["video_id"]
-
-                self.history["uploaded_videos"].append({
-                    "post_id": joke.post_id,
-                    "youtube_id": upload_result["video_id"],
-                    "timestamp": datetime.now().isoformat()
-                })
-                self._save_history()
-            except Exception as e:
-                print(f"❌ Upload failed: {e}")
-                result["upload_error"] = str(e)
+            # Track in history
+            await self._record_history({"type": "generated", "post_id": joke.post_id})
 
-        print("\n" + "=" * 50)
-        print("✨ Pipeline Complete!")
-        print("=" * 50)
+            result = {
+                "post_id": joke.post_id,
+                "subreddit": joke.subreddit,
+                "video_path": video_path,
+                "duration": tts_result.total_duration
+            }
 
-        return result
+            # Subtitles next to the video, for captions on upload or editing
+            try:
+                result["subtitles_path"] = self.tts.export_srt(
+                    tts_result, str(Path(video_path).with_suffix(".srt"))
+                )
+            except OSError as e:
+                print(f"⚠️ Could not write subtitles: {e}")
+
+            # Step 4: Upload (optional)
+            if upload:
+                try:
+                    async with self._upload_lock:
+                        upload_result = await loop.run_in_executor(
+                            None, self.upload_to_youtube, video_path, joke, privacy
+                        )
+                    result["youtube_url"] = upload_result["url"]
+                    result["youtube_id"] = upload_result["video_id"]
+
+                    await self._record_history({
+                        "type": "uploaded",
+                        "post_id": joke.post_id,
+                        "youtube_id": upload_result["video_id"],
+                        "timestamp": datetime.now().isoformat()
+                    })
+                except Exception as e:
+                    print(f"❌ Upload failed: {e}")
+                    result["upload_error"] = str(e)
+
+            print("\n" + "=" * 50)
+            print("✨ Pipeline Complete!")
+            print("=" * 50)
+
+            return result
+        finally:
+            self._claimed_ids.discard(joke.post_id)
 
 
 async def main():
@@ -287,19 +369,37 @@ async def main():
         default=1,
         help="Number of videos to generate"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=2,
+        help="Number of videos to generate at the same time"
+    )
 
     args = parser.parse_args()
 
     bot = RedditVideoBot()
 
-    for i in range(args.count):
-        if args.count > 1:
-            print(f"\n📹 Generating video {i + 1}/{args.count}")
+    # Overlap fetch/TTS/render/upload of consecutive videos
+    slots = asyncio.Semaphore(max(1, args.concurrency))
 
-        result = await bot.run_pipeline(
-            upload=not args.no_upload,
-            privacy=args.privacy
-        )
+    async def run_one(i: int) -> Optional[dict]:
+        async with slots:
+            if args.count > 1:
+                print(f"\n📹 Generating video {i + 1}/{args.count}")
+
+            return await bot.run_pipeline(
+                upload=not args.no_upload,
+                privacy=args.privacy
+            )
+
+    for next_result in asyncio.as_completed([run_one(i) for i in range(args.count)]):
+        # One failed video shouldn't abort the ones still running
+        try:
+            result = await next_result
+        except Exception as e:
+            print(f"\n❌ Failed to generate video: {e}")
+            continue
 
         if result:
             print(f"\n📊 Result: {json.dumps(result, indent=2)}")
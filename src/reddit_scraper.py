@@ -4,15 +4,65 @@ Fetches top jokes from Reddit using public JSON endpoints.
 Falls back to free Joke APIs if Reddit is unavailable.
 """
 
+import asyncio
+import heapq
+import html
+import json
 import random
 import re
 import time
+import aiohttp
 import requests
-from dataclasses import dataclass
-from typing import Optional
-
-
-@dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # C decoder, takes bytes directly
+except ImportError:
+    _json_loads = json.loads
+
+
+# Post fields the scraper reads; everything else is dropped at fetch time
+_POST_FIELDS = ("title", "selftext", "score", "stickied", "permalink", "id")
+
+# Compiled once for _clean_text
+# Markdown links [text](url) -> text and bare URLs -> '' in one pass
+_LINKS = re.compile(r'\[([^\]]+)\]\([^\)]+\)|https?://\S+')
+_URL = re.compile(r'https?://\S+')
+# Bold, italic and strikethrough in one alternation; exactly one group matches
+_MD_FORMAT = re.compile(r'\*\*([^\*]+)\*\*|\*([^\*]+)\*|~~([^~]+)~~')
+# Single-character cleanup after unescaping: zero-width spaces, nbsp, smart quotes
+_CHAR_MAP = str.maketrans({
+    '\u200b': '',
+    '\u00a0': ' ',
+    '\u2018': "'",
+    '\u2019': "'",
+    '\u201c': '"',
+    '\u201d': '"',
+})
+# Edit notes run to the end of their line; a negated class needs no $ anchor
+_EDIT = re.compile(r'(?i)edit:[^\n]*')
+_BLANKS = re.compile(r'\n{3,}')
+
+
+def _unwrap_link(match: re.Match) -> str:
+    """Keeps a markdown link's text (minus any URL in it); drops bare URLs."""
+    label = match[1]
+    if label is None:
+        return ''
+    return _URL.sub('', label) if '://' in label else label
+
+
+def _unwrap_format(match: re.Match) -> str:
+    """Returns the text inside whichever formatting marker matched."""
+    return match[match.lastindex]
+
+
+@dataclass(slots=True, frozen=True)
 class RedditPost:
     """Represents a Reddit post with relevant data for video generation."""
     title: str
@@ -21,13 +71,15 @@ class RedditPost:
     score: int
     url: str
     post_id: str
+    full_text: str = field(init=False, repr=False, compare=False)
 
-    @property
-    def full_text(self) -> str:
-        """Returns the complete text for TTS."""
+    def __post_init__(self):
+        # Complete text for TTS, built once (frozen, so set via object)
         if self.body:
-            return f"{self.title}\n\n{self.body}"
-        return self.title
+            full_text = f"{self.title}\n\n{self.body}"
+        else:
+            full_text = self.title
+        object.__setattr__(self, "full_text", full_text)
 
     @property
     def setup(self) -> str:
@@ -61,14 +113,39 @@ class RedditScraper:
         "3amjokes",
     ]
 
+    # Max subreddit requests in flight at once
+    MAX_CONCURRENT_FETCHES = 5
+
+    # Subreddit listings are reused for this many seconds
+    CACHE_TTL = 300
+    CACHE_SIZE = 32
+
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
             "User-Agent": self.USER_AGENT
         })
 
-    def _fetch_subreddit_json(
+        # Keep-alive connection pool, retrying transient failures
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504]
+            )
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # (subreddit, sort, time_filter, limit) ->
+        #     (fetched_at, posts, etag, last_modified)
+        self._listing_cache: dict[tuple, tuple] = {}
+
+    async def _fetch_subreddit_json(
         self,
+        session: aiohttp.ClientSession,
         subreddit: str,
         sort: str = "top",
         time_filter: str = "day",
@@ -76,97 +153,235 @@ class RedditScraper:
     ) -> list[dict]:
         """
         Fetches posts from a subreddit using JSON endpoint.
+        Fresh responses are served from a short-lived in-memory cache;
+        stale ones are revalidated with a conditional GET.
         """
+        key = (subreddit, sort, time_filter, limit)
+        cached = self._listing_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.CACHE_TTL:
+            return cached[1]
+
         url = f"{self.BASE_URL}/r/{subreddit}/{sort}.json"
         params = {
             "limit": limit,
             "t": time_filter
         }
 
-        try:
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-            posts = data.get("data", {}).get("children", [])
+        # Let Reddit answer 304 (no body) if the listing hasn't changed
+        headers = {}
+        if cached:
+            _, _, etag, last_modified = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
 
-            return [post["data"] for post in posts]
-
-        except requests.RequestException as e:
+        try:
+            async with session.get(url, params=params, headers=headers) as response:
+                if response.status == 304 and cached:
+                    posts = cached[1]
+                else:
+                    response.raise_for_status()
+                    data = _json_loads(await response.read())
+
+                    # Keep only the fields we use, so the full post dicts can be freed
+                    posts = [
+                        {k: post["data"][k] for k in _POST_FIELDS if k in post["data"]}
+                        for post in data.get("data", {}).get("children", [])
+                    ]
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+
+            # Drop the oldest entry once full (dicts keep insertion order)
+            self._listing_cache.pop(key, None)
+            if len(self._listing_cache) >= self.CACHE_SIZE:
+                del self._listing_cache[next(iter(self._listing_cache))]
+            self._listing_cache[key] = (time.monotonic(), posts, etag, last_modified)
+
+            return posts
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
             print(f"Error fetching r/{subreddit}: {e}")
             return []
 
-    def get_top_joke(
+    async def get_top_joke(
         self,
         subreddits: Optional[list[str]] = None,
         time_filter: str = "day",
         min_score: int = 50,
         max_length: int = 800,
-        min_length: int = 100  # Increased for longer videos (10+ seconds)
+        min_length: int = 100,  # Increased for longer videos (10+ seconds)
+        per_sub_cap: int = 3
     ) -> Optional[RedditPost]:
         """
         Fetches a top joke suitable for a short video.
+        All subreddits are fetched concurrently.
+        """
+        candidates = await self._collect_candidates(
+            subreddits,
+            time_filter=time_filter,
+            min_score=min_score,
+            max_length=max_length,
+            min_length=min_length,
+            per_sub_cap=per_sub_cap
+        )
+
+        if not candidates:
+            print("No jokes found from Reddit, trying backup APIs...")
+            return await asyncio.to_thread(self._get_joke_from_api)
+
+        # Pick from top 10 by score randomly
+        top_candidates = heapq.nlargest(10, candidates, key=lambda x: x.score)
+
+        return random.choice(top_candidates)
+
+    async def _collect_candidates(
+        self,
+        subreddits: Optional[list[str]] = None,
+        time_filter: str = "day",
+        min_score: int = 50,
+        max_length: int = 800,
+        min_length: int = 100,
+        per_sub_cap: int = 3,
+        max_candidates: int = 20,
+        strong_count: int = 10
+    ) -> list[RedditPost]:
+        """
+        Scans the subreddits once and returns every viable joke.
+
+        Subreddits are processed in the order their responses arrive. The
+        scan stops early, cancelling fetches still in flight, once the pool
+        holds max_candidates jokes or strong_count jokes scoring above
+        5 * min_score.
         """
         subreddits = subreddits or self.SHORT_CONTENT_SUBREDDITS
         candidates = []
+        strong = 0
+
+        async with aiohttp.ClientSession(
+            headers={"User-Agent": self.USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as session:
+            semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_FETCHES)
+
+            async def fetch(subreddit_name: str) -> tuple[str, list[dict]]:
+                async with semaphore:
+                    try:
+                        posts = await self._fetch_subreddit_json(
+                            session,
+                            subreddit_name,
+                            sort="top",
+                            time_filter=time_filter,
+                            limit=25
+                        )
+                    except Exception as e:
+                        # One failed subreddit shouldn't sink the others
+                        print(f"Error fetching r/{subreddit_name}: {e}")
+                        posts = []
+                    return subreddit_name, posts
+
+            tasks = [asyncio.create_task(fetch(name)) for name in subreddits]
 
-        for subreddit_name in subreddits:
-            posts = self._fetch_subreddit_json(
-                subreddit_name,
-                sort="top",
-                time_filter=time_filter,
-                limit=25
-            )
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    subreddit_name, posts = await next_done
+
+                    found = list(self._iter_candidates(
+                        subreddit_name,
+                        posts,
+                        min_score=min_score,
+                        max_length=max_length,
+                        min_length=min_length,
+                        per_sub_cap=per_sub_cap
+                    ))
+                    candidates.extend(found)
+                    strong += sum(1 for post in found if post.score > min_score * 5)
+
+                    # Enough candidates to pick from
+                    if len(candidates) >= max_candidates or strong >= strong_count:
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        return candidates
+
+    def _iter_candidates(
+        self,
+        subreddit_name: str,
+        posts: list[dict],
+        min_score: int,
+        max_length: int,
+        min_length: int,
+        per_sub_cap: int
+    ) -> Iterator[RedditPost]:
+        """
+        Yields the viable jokes among one subreddit's raw posts.
 
-            # Small delay to avoid rate limiting
-            time.sleep(0.5)
+        Rejected posts never become RedditPost objects. Posts arrive sorted
+        by score, so the subreddit stops contributing once it has produced
+        per_sub_cap viable candidates.
+        """
+        needs_body = subreddit_name in ["Jokes", "dadjokes", "cleanjokes", "3amjokes"]
+        yielded = 0
 
-            for post in posts:
-                # Skip stickied/pinned posts
-                if post.get("stickied", False):
-                    continue
+        for post in posts:
+            # Cheap checks first, before cleaning any text
+            # Skip stickied/pinned posts
+            if post.get("stickied", False):
+                continue
 
-                # Get clean text
-                title = self._clean_text(post.get("title", ""))
-                body = self._clean_text(post.get("selftext", ""))
-                full_text = f"{title} {body}".strip()
+            # Check score
+            score = post.get("score", 0)
+            if score < min_score:
+                continue
 
-                # Check length constraints
-                if len(full_text) < min_length or len(full_text) > max_length:
-                    continue
+            raw_title = post.get("title", "")
+            raw_body = post.get("selftext", "")
 
-                # Check score
-                score = post.get("score", 0)
-                if score < min_score:
-                    continue
+            # Must have a punchline (body text) for joke subreddits
+            if needs_body and raw_body in ("", "[removed]", "[deleted]"):
+                continue
 
-                # Must have a punchline (body text) for joke subreddits
-                if subreddit_name in ["Jokes", "dadjokes", "cleanjokes", "3amjokes"]:
-                    if not body or body == "[removed]" or body == "[deleted]":
-                        continue
+            # Cleaning only shortens text, so short raw text stays too short
+            if len(raw_title) + len(raw_body) + 1 < min_length:
+                continue
 
-                candidates.append(RedditPost(
-                    title=title,
-                    body=body,
-                    subreddit=subreddit_name,
-                    score=score,
-                    url=f"https://reddit.com{post.get('permalink', '')}",
-                    post_id=post.get("id", "")
-                ))
+            # Get clean text
+            title = self._clean_text(raw_title)
+            body = self._clean_text(raw_body)
+            full_text = f"{title} {body}".strip()
 
-        if not candidates:
-            print("No jokes found from Reddit, trying backup APIs...")
-            return self._get_joke_from_api()
+            # Check length constraints
+            if len(full_text) < min_length or len(full_text) > max_length:
+                continue
 
-        # Sort by score and pick from top 10 randomly
-        candidates.sort(key=lambda x: x.score, reverse=True)
-        top_candidates = candidates[:10]
+            if needs_body:
+                if not body or body == "[removed]" or body == "[deleted]":
+                    continue
 
-        return random.choice(top_candidates)
+            yield RedditPost(
+                title=title,
+                body=body,
+                subreddit=subreddit_name,
+                score=score,
+                url=f"https://reddit.com{post.get('permalink', '')}",
+                post_id=post.get("id", "")
+            )
+
+            yielded += 1
+            if yielded >= per_sub_cap:
+                return
+
+    def get_top_joke_sync(self, **kwargs) -> Optional[RedditPost]:
+        """Blocking wrapper around get_top_joke for non-async callers."""
+        return asyncio.run(self.get_top_joke(**kwargs))
 
     def _get_joke_from_api(self) -> Optional[RedditPost]:
         """
         Backup: Fetches a joke from free Joke APIs.
+        All APIs are queried at once and the first usable answer wins.
         """
         apis = [
             self._fetch_from_jokeapi,
@@ -174,16 +389,20 @@ class RedditScraper:
             self._fetch_from_icanhazdadjoke,
         ]
 
-        random.shuffle(apis)
-
-        for api_func in apis:
-            try:
-                joke = api_func()
-                if joke:
-                    return joke
-            except Exception as e:
-                print(f"API error: {e}")
-                continue
+        executor = ThreadPoolExecutor(max_workers=len(apis))
+        try:
+            futures = [executor.submit(api) for api in apis]
+            for future in as_completed(futures):
+                try:
+                    joke = future.result()
+                    if joke:
+                        return joke
+                except Exception as e:
+                    print(f"API error: {e}")
+                    continue
+        finally:
+            # Don't wait for slower APIs once we have a joke
+            executor.shutdown(wait=False, cancel_futures=True)
 
         return None
 
@@ -197,7 +416,7 @@ class RedditScraper:
 
         response = self.session.get(url, params=params, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = _json_loads(response.content)
 
         if data.get("error"):
             return None
@@ -217,7 +436,7 @@ class RedditScraper:
 
         response = self.session.get(url, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = _json_loads(response.content)
 
         return RedditPost(
             title=data.get("setup", ""),
@@ -235,18 +454,14 @@ class RedditScraper:
 
         response = self.session.get(url, headers=headers, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = _json_loads(response.content)
 
         joke_text = data.get("joke", "")
 
-        # Try to split into setup and punchline
-        if "?" in joke_text:
-            parts = joke_text.split("?", 1)
-            setup = parts[0] + "?"
-            punchline = parts[1].strip() if len(parts) > 1 else ""
-        else:
-            setup = joke_text
-            punchline = ""
+        # Try to split into setup and punchline at the first "?"
+        setup, sep, rest = joke_text.partition("?")
+        setup += sep
+        punchline = rest.strip()
 
         return RedditPost(
             title=setup,
@@ -257,27 +472,32 @@ class RedditScraper:
             post_id=data.get("id", f"dad_{random.randint(1000, 9999)}")
         )
 
-    def get_multiple_jokes(
+    async def get_multiple_jokes(
         self,
         count: int = 5,
         **kwargs
     ) -> list[RedditPost]:
-        """Fetches multiple unique jokes."""
-        jokes = []
-        seen_ids = set()
+        """Fetches multiple unique jokes from a single scan."""
+        kwargs.setdefault("per_sub_cap", count)
+        kwargs.setdefault("max_candidates", count * 2)
+
+        candidates = await self._collect_candidates(**kwargs)
+        random.shuffle(candidates)
+        jokes = candidates[:count]
+
+        # Top up from the backup APIs if Reddit came up short
+        seen_ids = {joke.post_id for joke in jokes}
         attempts = 0
         max_attempts = count * 3
 
         while len(jokes) < count and attempts < max_attempts:
-            joke = self.get_top_joke(**kwargs)
+            joke = await asyncio.to_thread(self._get_joke_from_api)
             attempts += 1
 
             if joke and joke.post_id not in seen_ids:
                 jokes.append(joke)
                 seen_ids.add(joke.post_id)
 
-            time.sleep(1)
-
         return jokes
 
     def _clean_text(self, text: str) -> str:
@@ -285,26 +505,30 @@ class RedditScraper:
         if not text:
             return ""
 
-        # Remove markdown links [text](url) -> text
-        text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-
-        # Remove URLs
-        text = re.sub(r'https?://\S+', '', text)
+        # Remove markdown links [text](url) -> text, and URLs
+        text = _LINKS.sub(_unwrap_link, text)
 
         # Remove Reddit formatting
-        text = re.sub(r'\*\*([^\*]+)\*\*', r'\1', text)  # Bold
-        text = re.sub(r'\*([^\*]+)\*', r'\1', text)  # Italic
-        text = re.sub(r'~~([^~]+)~~', r'\1', text)  # Strikethrough
-        text = re.sub(r'&amp;', '&', text)
-        text = re.sub(r'&lt;', '<', text)
-        text = re.sub(r'&gt;', '>', text)
-        text = re.sub(r'&#x200B;', '', text)
-
-        # Remove edit notes
-        text = re.sub(r'edit:.*$', '', text, flags=re.IGNORECASE | re.MULTILINE)
-
-        # Clean whitespace
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text, found = _MD_FORMAT.subn(_unwrap_format, text)
+        # Nested markers (e.g. ~~**word**~~) are peeled one layer per pass
+        while found and ('*' in text or '~~' in text):
+            text, found = _MD_FORMAT.subn(_unwrap_format, text)
+        # Reddit escapes entities twice (&amp;#x200B;), so decode until stable
+        while '&' in text:
+            decoded = html.unescape(text)
+            if decoded == text:
+                break
+            text = decoded
+        text = text.translate(_CHAR_MAP)  # Zero-width spaces, odd characters
+
+        # Remove edit notes (most posts have none, so skip the regex then;
+        # non-ASCII text keeps it, since IGNORECASE also matches e.g. "EDİT:")
+        if 'edit:' in text.lower() or not text.isascii():
+            text = _EDIT.sub('', text)
+
+        # Clean whitespace (substring check is a C scan; skip the regex if no run)
+        if '\n\n\n' in text:
+            text = _BLANKS.sub('\n\n', text)
         text = text.strip()
 
         return text
@@ -315,7 +539,7 @@ if __name__ == "__main__":
     scraper = RedditScraper()
 
     print("Fetching joke (no API key required)...")
-    joke = scraper.get_top_joke()
+    joke = scraper.get_top_joke_sync()
 
     if joke:
         print(f"\n✅ Found joke!")
@@ -4,10 +4,82 @@ Uses Groq API (Llama 3.1) to generate engaging titles, descriptions, and usernam
 """
 
 import os
+import json
 import random
+import shelve
+import hashlib
+import threading
 import requests
+from collections import OrderedDict
 from typing import Optional, Tuple
 
+try:
+    import orjson
+    _json_loads = orjson.loads  # C decoder, takes bytes directly
+except ImportError:
+    _json_loads = json.loads
+
+
+# Prompt templates, filled with str.format per call
+_SYSTEM_PROMPT = "You are a creative social media expert. Be concise and follow instructions exactly."
+
+_USERNAME_PROMPT = """Generate a realistic, funny Twitter/X username for someone who posts jokes.
+
+Rules:
+- Create a display name (like "Comedy Central" or "Dad Joke Dan")
+- Create a handle starting with @ (like @comedy_central or @dadjoke_dan)
+- Make it sound like a real person or comedy account
+- Keep display name under 20 characters
+- Keep handle under 15 characters (not counting @)
+- Be creative and varied
+
+Return in this exact format (nothing else):
+DisplayName
+@handle"""
+
+_TITLE_PROMPT = """Generate a short, viral YouTube Shorts title for this joke.
+The title should be catchy, use emojis, and make people want to watch.
+Maximum 60 characters. Don't include the punchline.
+
+Joke setup: {setup}
+Punchline: {punchline}
+
+Rules:
+- Use 1-2 emojis max
+- Create curiosity/suspense
+- Don't spoil the punchline
+- Keep it under 60 characters
+
+Return ONLY the title, nothing else."""
+
+_DESCRIPTION_PROMPT = """Write a short YouTube Shorts description for this joke video.
+Include relevant hashtags and a call to action.
+
+Joke: {setup} - {punchline}
+Source: {source}
+
+Rules:
+- 2-3 sentences max
+- Include 5-7 relevant hashtags
+- Add a simple call to action (like, follow, etc.)
+- Keep it casual and fun
+
+Return ONLY the description, nothing else."""
+
+_ALL_PROMPT = """Write the metadata for a YouTube Shorts joke video posted by a Twitter/X style comedy account.
+
+Joke setup: {setup}
+Punchline: {punchline}
+Source: {source}
+
+Return a JSON object with exactly these keys:
+- "title": short, viral title. Catchy, 1-2 emojis max, creates curiosity, doesn't spoil the punchline, under 60 characters
+- "description": 2-3 sentences max, casual and fun, with 5-7 relevant hashtags and a simple call to action (like, follow, etc.)
+- "display_name": realistic, funny display name for the account (like "Dad Joke Dan"), under 20 characters
+- "handle": matching handle starting with @ (like @dadjoke_dan), under 15 characters not counting @
+
+Return ONLY the JSON object."""
+
 
 class TitleGenerator:
     """Generates viral titles, descriptions, and fake usernames using Groq LLM."""
@@ -15,6 +87,9 @@ class TitleGenerator:
     GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
     MODEL = "llama-3.1-8b-instant"
 
+    # In-memory response cache entries (LRU)
+    CACHE_SIZE = 256
+
     # Fallback usernames if API unavailable
     FALLBACK_NAMES = [
         ("DadJokeDave", "@dadjoke_dave"),
@@ -34,8 +109,21 @@ class TitleGenerator:
         ("PunchlinePro", "@punchline_pro"),
     ]
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        cache_path: Optional[str] = None
+    ):
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        # Shared session keeps the TLS connection to Groq alive between calls
+        self.session = session or requests.Session()
+        # (setup, punchline, source) -> generate_all result
+        self._memo: dict[tuple[str, str, str], dict] = {}
+        # Request hash -> reply text, optionally persisted with shelve
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._cache_path = cache_path
+        self._cache_lock = threading.Lock()
         if not self.api_key:
             print("⚠️ GROQ_API_KEY not found, using fallback values")
 
@@ -49,30 +137,14 @@ class TitleGenerator:
         if not self.api_key:
             return random.choice(self.FALLBACK_NAMES)
 
-        prompt = """Generate a realistic, funny Twitter/X username for someone who posts jokes.
-
-Rules:
-- Create a display name (like "Comedy Central" or "Dad Joke Dan")
-- Create a handle starting with @ (like @comedy_central or @dadjoke_dan)
-- Make it sound like a real person or comedy account
-- Keep display name under 20 characters
-- Keep handle under 15 characters (not counting @)
-- Be creative and varied
-
-Return in this exact format (nothing else):
-DisplayName
-@handle"""
+        prompt = _USERNAME_PROMPT
 
         try:
-            response = self._call_groq(prompt)
+            # Same prompt every time, so a cached reply would repeat the name
+            response = self._call_groq(prompt, cache=False)
             lines = response.strip().split('\n')
             if len(lines) >= 2:
-                display_name = lines[0].strip()[:20]
-                handle = lines[1].strip()
-                if not handle.startswith('@'):
-                    handle = '@' + handle
-                handle = handle[:16]  # @+ 15 chars max
-                return (display_name, handle)
+                return self._clean_username(lines[0], lines[1])
         except Exception as e:
             print(f"⚠️ Username generation error: {e}")
 
@@ -83,27 +155,11 @@ DisplayName
         if not self.api_key:
             return self._fallback_title(joke_setup)
 
-        prompt = f"""Generate a short, viral YouTube Shorts title for this joke.
-The title should be catchy, use emojis, and make people want to watch.
-Maximum 60 characters. Don't include the punchline.
-
-Joke setup: {joke_setup}
-Punchline: {joke_punchline}
-
-Rules:
-- Use 1-2 emojis max
-- Create curiosity/suspense
-- Don't spoil the punchline
-- Keep it under 60 characters
-
-Return ONLY the title, nothing else."""
+        prompt = _TITLE_PROMPT.format(setup=joke_setup, punchline=joke_punchline)
 
         try:
             response = self._call_groq(prompt)
-            title = response.strip().strip('"').strip("'")
-            if len(title) > 100:
-                title = title[:97] + "..."
-            return title
+            return self._clean_title(response)
         except Exception as e:
             print(f"⚠️ Groq API error: {e}")
             return self._fallback_title(joke_setup)
@@ -118,19 +174,9 @@ Return ONLY the title, nothing else."""
         if not self.api_key:
             return self._fallback_description(source)
 
-        prompt = f"""Write a short YouTube Shorts description for this joke video.
-Include relevant hashtags and a call to action.
-
-Joke: {joke_setup} - {joke_punchline}
-Source: {source}
-
-Rules:
-- 2-3 sentences max
-- Include 5-7 relevant hashtags
-- Add a simple call to action (like, follow, etc.)
-- Keep it casual and fun
-
-Return ONLY the description, nothing else."""
+        prompt = _DESCRIPTION_PROMPT.format(
+            setup=joke_setup, punchline=joke_punchline, source=source
+        )
 
         try:
             response = self._call_groq(prompt)
@@ -139,6 +185,77 @@ Return ONLY the description, nothing else."""
             print(f"⚠️ Groq API error: {e}")
             return self._fallback_description(source)
 
+    def generate_all(
+        self,
+        joke_setup: str,
+        joke_punchline: str,
+        source: str = "Reddit"
+    ) -> dict:
+        """
+        Generates title, description and username in a single Groq request.
+
+        Results are memoized per joke, so the video and upload steps share
+        one API call.
+
+        Args:
+            joke_setup: Joke setup text
+            joke_punchline: Joke punchline text
+            source: Where the joke came from (used in the description)
+
+        Returns:
+            Dict with keys title, description, display_name, handle
+        """
+        key = (joke_setup, joke_punchline, source)
+        if key in self._memo:
+            return self._memo[key]
+
+        display_name, handle = random.choice(self.FALLBACK_NAMES)
+        result = {
+            "title": self._fallback_title(joke_setup),
+            "description": self._fallback_description(source),
+            "display_name": display_name,
+            "handle": handle,
+        }
+
+        if self.api_key:
+            prompt = _ALL_PROMPT.format(
+                setup=joke_setup, punchline=joke_punchline, source=source
+            )
+
+            try:
+                data = _json_loads(self._call_groq(prompt, json_mode=True, max_tokens=400))
+                if data.get("title"):
+                    result["title"] = self._clean_title(data["title"])
+                if data.get("description"):
+                    result["description"] = data["description"].strip()
+                if data.get("display_name") and data.get("handle"):
+                    result["display_name"], result["handle"] = self._clean_username(
+                        data["display_name"], data["handle"]
+                    )
+            except Exception as e:
+                # Not memoized, so a later step can retry the request
+                print(f"⚠️ Groq API error: {e}")
+                return result
+
+        self._memo[key] = result
+        return result
+
+    def _clean_title(self, title: str) -> str:
+        """Strips quotes and caps title length."""
+        title = title.strip().strip('"').strip("'")
+        if len(title) > 100:
+            title = title[:97] + "..."
+        return title
+
+    def _clean_username(self, display_name: str, handle: str) -> Tuple[str, str]:
+        """Trims display name and normalizes the @handle."""
+        display_name = display_name.strip()[:20]
+        handle = handle.strip()
+        if not handle.startswith('@'):
+            handle = '@' + handle
+        handle = handle[:16]  # @+ 15 chars max
+        return (display_name, handle)
+
     def generate_engagement_stats(self) -> Tuple[str, str, str]:
         """
         Generates realistic looking engagement numbers.
@@ -151,17 +268,44 @@ Return ONLY the description, nothing else."""
         retweets = random.randint(int(likes * 0.1), int(likes * 0.4))
         comments = random.randint(int(likes * 0.05), int(likes * 0.15))
 
-        def format_number(n: int) -> str:
-            if n >= 1000000:
-                return f"{n/1000000:.1f}M"
-            elif n >= 1000:
-                return f"{n/1000:.1f}K"
-            return str(n)
+        return (
+            self._format_number(likes),
+            self._format_number(retweets),
+            self._format_number(comments)
+        )
+
+    @staticmethod
+    def _format_number(n: int) -> str:
+        """Formats a count like 12.3K or 1.2M."""
+        if n >= 1000000:
+            return f"{n/1000000:.1f}M"
+        elif n >= 1000:
+            return f"{n/1000:.1f}K"
+        return str(n)
+
+    def _call_groq(
+        self,
+        prompt: str,
+        json_mode: bool = False,
+        max_tokens: int = 150,
+        cache: bool = True
+    ) -> str:
+        """
+        Makes API call to Groq (json_mode asks for a JSON object reply).
+
+        Replies are cached by a hash of the request, in memory and, if a
+        cache_path was given, on disk, so re-processing a joke costs no
+        network call.
+        """
+        key = hashlib.sha1(
+            f"{self.MODEL}\0{json_mode}\0{max_tokens}\0{prompt}".encode("utf-8")
+        ).hexdigest()
 
-        return (format_number(likes), format_number(retweets), format_number(comments))
+        if cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
 
-    def _call_groq(self, prompt: str) -> str:
-        """Makes API call to Groq."""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -172,18 +316,20 @@ Return ONLY the description, nothing else."""
             "messages": [
                 {
                     "role": "system",
-                    "content": "You are a creative social media expert. Be concise and follow instructions exactly."
+                    "content": _SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
                     "content": prompt
                 }
             ],
-            "max_tokens": 150,
+            "max_tokens": max_tokens,
             "temperature": 0.9
         }
+        if json_mode:
+            data["response_format"] = {"type": "json_object"}
 
-        response = requests.post(
+        response = self.session.post(
             self.GROQ_API_URL,
             headers=headers,
             json=data,
@@ -191,8 +337,53 @@ Return ONLY the description, nothing else."""
         )
         response.raise_for_status()
 
-        result = response.json()
-        return result["choices"][0]["message"]["content"]
+        result = _json_loads(response.content)
+        content = result["choices"][0]["message"]["content"]
+
+        if cache:
+            if json_mode:
+                _json_loads(content)  # Never cache a reply the caller can't parse
+            self._cache_put(key, content)
+
+        return content
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        """Looks a reply up in memory, then in the on-disk cache."""
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+            if self._cache_path:
+                try:
+                    with shelve.open(self._cache_path) as db:
+                        value = db.get(key)
+                except Exception as e:
+                    print(f"⚠️ Title cache read error: {e}")
+                    value = None
+                if value is not None:
+                    self._remember(key, value)
+                return value
+
+        return None
+
+    def _cache_put(self, key: str, value: str):
+        """Stores a reply in memory and in the on-disk cache."""
+        with self._cache_lock:
+            self._remember(key, value)
+            if self._cache_path:
+                try:
+                    with shelve.open(self._cache_path) as db:
+                        db[key] = value
+                except Exception as e:
+                    print(f"⚠️ Title cache write error: {e}")
+
+    def _remember(self, key: str, value: str):
+        """Adds to the in-memory LRU, evicting the oldest entry when full."""
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
 
     def _fallback_title(self, joke_setup: str) -> str:
         """Fallback title when API is unavailable."""
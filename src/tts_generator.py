@@ -4,13 +4,33 @@ Uses Edge-TTS with gTTS fallback for CI/CD environments.
 """
 
 import asyncio
+import hashlib
 import json
 import os
 import re
+import shutil
+import subprocess
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Optional
 from pathlib import Path
 
+import numpy as np
+
+try:
+    import orjson
+    # C encoder/decoder working on bytes, compact output like the fallback
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    _json_loads = json.loads
+
+# One sentence: from a non-space up to terminal punctuation that is followed
+# by whitespace, or to the end (same pieces as splitting on (?<=[.!?])\s+)
+_SENT_SCAN = re.compile(r'\S.*?(?:(?<=[.!?])(?=\s)|\Z)', re.S)
+
 
 @dataclass
 class TTSSegment:
@@ -35,12 +55,29 @@ class TTSGenerator:
     # Average speaking rate (words per second) for duration estimation
     WORDS_PER_SECOND = 2.5
 
+    # Voice mapping (anything else is passed to Edge-TTS as-is)
+    VOICES = {
+        "male_us": "en-US-GuyNeural",
+        "female_us": "en-US-JennyNeural",
+        "male_uk": "en-GB-RyanNeural",
+        "female_uk": "en-GB-SoniaNeural",
+        "male_dramatic": "en-US-ChristopherNeural",
+        "female_dramatic": "en-US-AriaNeural",
+    }
+
+    # Budget for hot audio kept in memory on top of the disk cache
+    CACHE_MEM_MB = 32
+
+    # Edge-TTS and gTTS both emit 24 kHz mono MP3, so silence must match
+    SILENCE_SAMPLE_RATE = 24000
+
     def __init__(
         self,
         voice: str = "male_dramatic",
         rate: str = "+0%",
         pitch: str = "+0Hz",
-        output_dir: str = "output/audio"
+        output_dir: str = "output/audio",
+        cache_mem_mb: Optional[float] = None
     ):
         self.voice = voice
         self.rate = rate
@@ -49,6 +86,118 @@ class TTSGenerator:
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self._use_gtts = False  # Will switch to True if Edge TTS fails
 
+        # Caps parallel Edge-TTS websockets across gathered fragments
+        self._sem = asyncio.Semaphore(int(os.getenv("TTS_CONCURRENCY", 4)))
+
+        # Content-addressed cache of synthesized audio + timings
+        self.cache_dir = self.output_dir / ".cache"
+        self.cache_dir.mkdir(exist_ok=True)
+        # One lock per key so concurrent tasks don't synthesize the same text twice
+        self._cache_locks: dict[str, asyncio.Lock] = {}
+
+        # LRU of key -> (audio bytes, timings), evicted by total size
+        self._mem_cache: OrderedDict[str, tuple[bytes, dict]] = OrderedDict()
+        self._mem_bytes = 0
+        mem_mb = self.CACHE_MEM_MB if cache_mem_mb is None else cache_mem_mb
+        self._mem_limit = int(mem_mb * 1024 * 1024)
+
+        # Encoded silence by duration in ms
+        self._silence: dict[int, bytes] = {}
+
+    def _cache_key(self, text: str) -> str:
+        """Hashes everything that changes the synthesized audio."""
+        engine = "gtts" if self._use_gtts else "edge"
+        raw = f"{engine}|{self.voice}|{self.rate}|{self.pitch}|{text}"
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    def _lru_get(self, key: str) -> Optional[tuple[bytes, dict]]:
+        """Returns an in-memory entry, marking it most recently used."""
+        entry = self._mem_cache.get(key)
+        if entry is not None:
+            self._mem_cache.move_to_end(key)
+        return entry
+
+    def _lru_put(self, key: str, audio: bytes, data: dict):
+        """Adds an in-memory entry, evicting the oldest ones over budget."""
+        if len(audio) > self._mem_limit:
+            return
+        old = self._mem_cache.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= len(old[0])
+        self._mem_cache[key] = (audio, data)
+        self._mem_bytes += len(audio)
+        while self._mem_bytes > self._mem_limit:
+            _, (evicted, _) = self._mem_cache.popitem(last=False)
+            self._mem_bytes -= len(evicted)
+
+    def _cache_load(self, key: str, output_path: Path) -> Optional[TTSResult]:
+        """Places cached audio at output_path and rebuilds its timings."""
+        entry = self._lru_get(key)
+        if entry is not None:
+            audio, data = entry
+            output_path.unlink(missing_ok=True)
+            output_path.write_bytes(audio)
+            return self._result_from_data(data, output_path)
+
+        cache_mp3 = self.cache_dir / f"{key}.mp3"
+        cache_json = self.cache_dir / f"{key}.json"
+        if not (cache_mp3.exists() and cache_json.exists()):
+            return None
+
+        try:
+            data = _json_loads(cache_json.read_bytes())
+            output_path.unlink(missing_ok=True)
+            # Copy, not link: outputs get rewritten later and must not reach the cache
+            shutil.copyfile(cache_mp3, output_path)
+            self._lru_put(key, output_path.read_bytes(), data)
+        except (OSError, ValueError):
+            return None
+
+        return self._result_from_data(data, output_path)
+
+    @staticmethod
+    def _result_from_data(data: dict, output_path: Path) -> TTSResult:
+        """Rebuilds a TTSResult from its cached timings."""
+        segments = [
+            TTSSegment(
+                text=seg["text"],
+                start_time=seg["start_time"],
+                end_time=seg["end_time"],
+                audio_file=str(output_path)
+            )
+            for seg in data["segments"]
+        ]
+        return TTSResult(
+            audio_file=str(output_path),
+            segments=segments,
+            total_duration=data["total_duration"]
+        )
+
+    def _cache_store(self, key: str, result: TTSResult):
+        """Stores a fresh result; files are renamed in so readers never see partial data."""
+        data = {
+            "total_duration": result.total_duration,
+            "segments": [
+                {"text": s.text, "start_time": s.start_time, "end_time": s.end_time}
+                for s in result.segments
+            ]
+        }
+        try:
+            self._lru_put(key, Path(result.audio_file).read_bytes(), data)
+        except OSError:
+            pass
+
+        tmp_mp3 = self.cache_dir / f"{key}.mp3.tmp"
+        tmp_json = self.cache_dir / f"{key}.json.tmp"
+        try:
+            shutil.copyfile(result.audio_file, tmp_mp3)
+            tmp_json.write_bytes(_json_dumps(data))
+            # MP3 first: a .json without its .mp3 is a miss anyway
+            os.replace(tmp_mp3, self.cache_dir / f"{key}.mp3")
+            os.replace(tmp_json, self.cache_dir / f"{key}.json")
+        except OSError as e:
+            print(f"⚠️ Could not cache TTS audio: {e}")
+
     async def generate_speech(
         self,
         text: str,
@@ -56,25 +205,46 @@ class TTSGenerator:
     ) -> TTSResult:
         """
         Generates speech audio from text.
-        Tries Edge-TTS first, falls back to gTTS if blocked.
+        Serves repeats from the memory/disk cache, otherwise tries
+        Edge-TTS first and falls back to gTTS if blocked.
         """
         output_path = self.output_dir / filename
 
-        # Remove existing file if any
-        if output_path.exists():
-            os.remove(output_path)
-
-        # Try Edge TTS first (better quality)
-        if not self._use_gtts:
-            try:
-                return await self._generate_edge_tts(text, filename)
-            except Exception as e:
-                print(f"⚠️ Edge TTS failed: {e}")
-                print("🔄 Switching to gTTS fallback...")
-                self._use_gtts = True
-
-        # Fallback to gTTS
-        return self._generate_gtts(text, filename)
+        # One syscall, no exists() race
+        output_path.unlink(missing_ok=True)
+
+        key = self._cache_key(text)
+        lock = self._cache_locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            cached = self._cache_load(key, output_path)
+            if cached:
+                return cached
+
+            # Try Edge TTS first (better quality)
+            if not self._use_gtts:
+                try:
+                    result = await self._generate_edge_tts(text, filename)
+                    self._cache_store(key, result)
+                    return result
+                except Exception as e:
+                    print(f"⚠️ Edge TTS failed: {e}")
+                    print("🔄 Switching to gTTS fallback...")
+                    self._use_gtts = True
+
+        # Fallback to gTTS (its audio differs, so it has its own cache key)
+        key = self._cache_key(text)
+        lock = self._cache_locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            cached = self._cache_load(key, output_path)
+            if cached:
+                return cached
+
+            # Blocking HTTPS + ffmpeg decode, keep them off the event loop
+            result = await asyncio.to_thread(self._generate_gtts, text, filename)
+            self._cache_store(key, result)
+            return result
 
     async def _generate_edge_tts(
         self,
@@ -86,16 +256,7 @@ class TTSGenerator:
 
         output_path = self.output_dir / filename
 
-        # Voice mapping
-        voices = {
-            "male_us": "en-US-GuyNeural",
-            "female_us": "en-US-JennyNeural",
-            "male_uk": "en-GB-RyanNeural",
-            "female_uk": "en-GB-SoniaNeural",
-            "male_dramatic": "en-US-ChristopherNeural",
-            "female_dramatic": "en-US-AriaNeural",
-        }
-        voice = voices.get(self.voice, self.voice)
+        voice = self.VOICES.get(self.voice, self.voice)
 
         communicate = edge_tts.Communicate(
             text,
@@ -104,24 +265,35 @@ class TTSGenerator:
             pitch=self.pitch
         )
 
-        word_timings = []
+        # Word boundaries as parallel columns (offsets are in 100 ns ticks)
+        words: list[str] = []
+        offsets: list[int] = []
+        durations: list[int] = []
 
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                with open(output_path, "ab") as f:
-                    f.write(chunk["data"])
-            elif chunk["type"] == "WordBoundary":
-                word_timings.append({
-                    "text": chunk["text"],
-                    "start": chunk["offset"] / 10_000_000,
-                    "duration": chunk["duration"] / 10_000_000
-                })
+        # Collect audio in memory so no disk write blocks the websocket reads
+        audio = bytearray()
+        add_audio = audio.extend
 
-        segments = self._create_segments_from_timings(text, word_timings)
+        async with self._sem:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    add_audio(chunk["data"])
+                elif chunk["type"] == "WordBoundary":
+                    words.append(chunk["text"])
+                    offsets.append(chunk["offset"])
+                    durations.append(chunk["duration"])
+
+        # Single write once the stream is done, never into a delivered copy
+        output_path.unlink(missing_ok=True)
+        output_path.write_bytes(audio)
+
+        starts = np.asarray(offsets, dtype=np.float64) / 10_000_000
+        lengths = np.asarray(durations, dtype=np.float64) / 10_000_000
+
+        segments = self._create_segments_from_timings(text, words, starts, lengths)
         total_duration = 0
-        if word_timings:
-            last_word = word_timings[-1]
-            total_duration = last_word["start"] + last_word["duration"]
+        if words:
+            total_duration = float(starts[-1] + lengths[-1])
 
         for segment in segments:
             segment.audio_file = str(output_path)
@@ -139,17 +311,16 @@ class TTSGenerator:
     ) -> TTSResult:
         """Generate speech using gTTS (Google Text-to-Speech)."""
         from gtts import gTTS
-        from pydub import AudioSegment
 
         output_path = self.output_dir / filename
 
         # Generate speech with gTTS
         tts = gTTS(text=text, lang='en', slow=False)
+        output_path.unlink(missing_ok=True)
         tts.save(str(output_path))
 
-        # Get actual duration from audio file
-        audio = AudioSegment.from_mp3(str(output_path))
-        total_duration = len(audio) / 1000.0  # Convert ms to seconds
+        # Get actual duration from the MP3 headers (no decode)
+        total_duration = _mp3_duration(output_path)
 
         # Estimate segments based on sentences
         segments = self._estimate_segments(text, total_duration)
@@ -166,40 +337,47 @@ class TTSGenerator:
     def _create_segments_from_timings(
         self,
         text: str,
-        word_timings: list[dict]
+        words: list[str],
+        starts: np.ndarray,
+        durations: np.ndarray
     ) -> list[TTSSegment]:
-        """Creates segments from Edge TTS word timings."""
-        if not word_timings:
+        """
+        Creates sentence segments from Edge TTS word timings.
+
+        Args:
+            text: Full text, used for estimation when there are no timings
+            words: Spoken words in order
+            starts: Start time of each word in seconds
+            durations: Duration of each word in seconds
+
+        Returns:
+            One segment per sentence (the last word always closes one)
+        """
+        if not words:
             return self._estimate_segments(text, 5.0)
 
-        segments = []
-        current_segment_words = []
-        current_segment_text = ""
-        segment_start = 0
-        sentence_enders = {'.', '!', '?'}
-
-        for i, word_data in enumerate(word_timings):
-            word = word_data["text"]
-            current_segment_words.append(word_data)
-            current_segment_text += word + " "
-
-            is_sentence_end = any(word.endswith(p) for p in sentence_enders)
-            is_last_word = i == len(word_timings) - 1
-
-            if is_sentence_end or is_last_word:
-                if current_segment_words:
-                    segment_end = word_data["start"] + word_data["duration"]
-                    segments.append(TTSSegment(
-                        text=current_segment_text.strip(),
-                        start_time=segment_start,
-                        end_time=segment_end
-                    ))
-                    if i + 1 < len(word_timings):
-                        segment_start = word_timings[i + 1]["start"]
-                    current_segment_words = []
-                    current_segment_text = ""
-
-        return segments
+        sentence_enders = ('.', '!', '?')
+        is_end = np.fromiter(
+            (word.endswith(sentence_enders) for word in words),
+            dtype=bool,
+            count=len(words)
+        )
+        is_end[-1] = True
+
+        # Last word of each segment, and the word that opens it
+        last = np.flatnonzero(is_end)
+        first = np.concatenate(([0], last[:-1] + 1))
+
+        seg_ends = starts[last] + durations[last]
+        seg_starts = starts[first]
+        seg_starts[0] = 0  # The first segment always starts at the top
+
+        return [
+            TTSSegment(text=" ".join(words[a:b + 1]), start_time=start, end_time=end)
+            for a, b, start, end in zip(
+                first.tolist(), last.tolist(), seg_starts.tolist(), seg_ends.tolist()
+            )
+        ]
 
     def _estimate_segments(
         self,
@@ -207,34 +385,29 @@ class TTSGenerator:
         total_duration: float
     ) -> list[TTSSegment]:
         """Estimate segments when no timing data available (gTTS fallback)."""
-        # Split text into sentences
-        sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-        sentences = [s for s in sentences if s]
+        # Scan sentences in one pass (matches are never empty)
+        sentences = [m.group() for m in _SENT_SCAN.finditer(text.strip())]
 
         if not sentences:
             return [TTSSegment(text=text, start_time=0, end_time=total_duration)]
 
         # Count words in each sentence for proportional timing
-        word_counts = [len(s.split()) for s in sentences]
-        total_words = sum(word_counts)
-
-        if total_words == 0:
-            total_words = 1
-
-        segments = []
-        current_time = 0
-
-        for sentence, word_count in zip(sentences, word_counts):
-            # Duration proportional to word count
-            duration = (word_count / total_words) * total_duration
-            segments.append(TTSSegment(
-                text=sentence,
-                start_time=current_time,
-                end_time=current_time + duration
-            ))
-            current_time += duration
+        word_counts = np.fromiter(
+            (len(s.split()) for s in sentences),
+            dtype=np.int64,
+            count=len(sentences)
+        )
+        total_words = max(int(word_counts.sum()), 1)
+
+        # Duration proportional to word count, boundaries from one cumsum
+        durations = word_counts * (total_duration / total_words)
+        ends = np.cumsum(durations)
+        starts = ends - durations
 
-        return segments
+        return [
+            TTSSegment(text=sentence, start_time=start, end_time=end)
+            for sentence, start, end in zip(sentences, starts.tolist(), ends.tolist())
+        ]
 
     async def generate_with_pause(
         self,
@@ -246,13 +419,28 @@ class TTSGenerator:
         """
         Generates speech with a pause between setup and punchline.
         """
-        from pydub import AudioSegment
-
-        # Generate setup audio
-        setup_result = await self.generate_speech(setup, "temp_setup.mp3")
+        output_path = self.output_dir / filename
 
-        # Generate punchline audio
-        punchline_result = await self.generate_speech(punchline, "temp_punchline.mp3")
+        # Replays of the same joke skip synthesis and joining entirely.
+        # The key embeds the current engine via _cache_key
+        used_gtts = self._use_gtts
+        combo_key = hashlib.blake2b(
+            f"{self._cache_key(setup)}|{self._cache_key(punchline)}|"
+            f"{pause_duration}|{output_path.suffix}".encode(),
+            digest_size=16
+        ).hexdigest()
+        cached = self._cache_load(combo_key, output_path)
+        if cached:
+            return cached
+
+        # Temp names derive from the output so concurrent jobs don't collide
+        stem = Path(filename).stem
+
+        # Synthesize setup and punchline in parallel
+        setup_result, punchline_result = await asyncio.gather(
+            self.generate_speech(setup, f"temp_{stem}_setup.mp3"),
+            self.generate_speech(punchline, f"temp_{stem}_punchline.mp3")
+        )
 
         # Combine segments with adjusted timing
         all_segments = setup_result.segments.copy()
@@ -267,15 +455,30 @@ class TTSGenerator:
 
         total_duration = offset + punchline_result.total_duration
 
-        # Combine audio files
-        setup_audio = AudioSegment.from_mp3(setup_result.audio_file)
-        punchline_audio = AudioSegment.from_mp3(punchline_result.audio_file)
-        pause = AudioSegment.silent(duration=int(pause_duration * 1000))
+        # A cache hit may have been copied here earlier, replace rather than truncate
+        output_path.unlink(missing_ok=True)
 
-        combined = setup_audio + pause + punchline_audio
+        # MP3 frames concatenate as-is, so join encoded bytes (no decode/re-encode)
+        silence = None
+        if output_path.suffix == ".mp3":
+            silence = self._silence_mp3(pause_duration)
 
-        output_path = self.output_dir / filename
-        combined.export(output_path, format="mp3")
+        if silence is not None:
+            output_path.write_bytes(
+                Path(setup_result.audio_file).read_bytes()
+                + silence
+                + Path(punchline_result.audio_file).read_bytes()
+            )
+        else:
+            # Fallback: other formats, or no ffmpeg for the silence template
+            from pydub import AudioSegment
+
+            setup_audio = AudioSegment.from_mp3(setup_result.audio_file)
+            punchline_audio = AudioSegment.from_mp3(punchline_result.audio_file)
+            pause = AudioSegment.silent(duration=int(pause_duration * 1000))
+
+            combined = setup_audio + pause + punchline_audio
+            combined.export(output_path, format=output_path.suffix.lstrip(".") or "mp3")
 
         # Clean up temp files
         try:
@@ -287,11 +490,98 @@ class TTSGenerator:
         for segment in all_segments:
             segment.audio_file = str(output_path)
 
-        return TTSResult(
+        result = TTSResult(
             audio_file=str(output_path),
             segments=all_segments,
             total_duration=total_duration
         )
+        # Edge failed over to gTTS mid-join: the audio no longer matches the
+        # key's engine and may mix both, so don't cache it
+        if self._use_gtts == used_gtts:
+            self._cache_store(combo_key, result)
+        return result
+
+    def export_srt(self, result: TTSResult, path: Optional[str] = None) -> str:
+        """
+        Writes the result's segments as an SRT subtitle file.
+
+        Args:
+            result: TTS result whose segments become subtitle cues
+            path: Output path (default: the audio file with a .srt suffix)
+
+        Returns:
+            Path to the written subtitle file
+        """
+        srt_path = Path(path) if path else Path(result.audio_file).with_suffix(".srt")
+        srt_path.write_text(_format_srt(result.segments), encoding="utf-8")
+        return str(srt_path)
+
+    def _silence_mp3(self, duration: float) -> Optional[bytes]:
+        """
+        Returns MP3 frames of silence, encoded once per duration.
+
+        Args:
+            duration: Length of the silence in seconds
+
+        Returns:
+            Raw MP3 frames, or None if ffmpeg is unavailable
+        """
+        ms = int(duration * 1000)
+        if ms in self._silence:
+            return self._silence[ms]
+
+        path = self.cache_dir / f"silence_{ms}.mp3"
+        if not path.exists():
+            tmp_path = self.cache_dir / f"silence_{ms}.tmp.mp3"
+            try:
+                subprocess.run(
+                    [
+                        "ffmpeg", "-y", "-loglevel", "error",
+                        "-f", "lavfi",
+                        "-i", f"anullsrc=r={self.SILENCE_SAMPLE_RATE}:cl=mono",
+                        "-t", f"{ms / 1000}",
+                        "-c:a", "libmp3lame", "-b:a", "48k",
+                        # Bare frames: tags or a Xing header mid-file confuse decoders
+                        "-write_xing", "0", "-id3v2_version", "0",
+                        str(tmp_path)
+                    ],
+                    check=True,
+                    capture_output=True
+                )
+                os.replace(tmp_path, path)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"⚠️ Could not encode silence, re-encoding instead: {e}")
+                return None
+
+        self._silence[ms] = path.read_bytes()
+        return self._silence[ms]
+
+
+def _srt_timestamp(seconds: float) -> str:
+    """Formats seconds as an SRT timestamp (HH:MM:SS,mmm)."""
+    ms = int(round(seconds * 1000))
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02},{ms:03}"
+
+
+def _format_srt(segments: list[TTSSegment]) -> str:
+    """Renders segments as SRT cues, one per segment."""
+    return "".join(
+        f"{i}\n{_srt_timestamp(seg.start_time)} --> {_srt_timestamp(seg.end_time)}\n{seg.text}\n\n"
+        for i, seg in enumerate(segments, 1)
+    )
+
+
+def _mp3_duration(path: Path) -> float:
+    """Reads an MP3's duration in seconds, decoding only if mutagen is missing."""
+    try:
+        from mutagen.mp3 import MP3
+        return MP3(str(path)).info.length
+    except ImportError:
+        from pydub import AudioSegment
+        return len(AudioSegment.from_mp3(str(path))) / 1000.0
 
 
 def generate_speech_sync(
@@ -3,12 +3,19 @@ Video Composer Module
 Creates Reddit story videos with realistic tweet-style text overlays.
 """
 
+import hashlib
+import itertools
 import os
 import random
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple
 from dataclasses import dataclass
-import textwrap
 
 from moviepy.editor import (
     VideoFileClip,
@@ -16,15 +23,266 @@ from moviepy.editor import (
     ImageClip,
     CompositeVideoClip,
     CompositeAudioClip,
-    concatenate_videoclips,
 )
-from moviepy.video.fx.all import crop, resize
+from moviepy.audio.fx.all import audio_loop, audio_fadein, audio_fadeout
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 
 from tts_generator import TTSResult, TTSSegment
 
 
+# Hardware H.264 encoders by preference: (codec, preset, extra ffmpeg params)
+_HW_ENCODERS = (
+    ("h264_nvenc", "p4", ["-rc", "vbr", "-cq", "23", "-b:v", "0"]),
+    ("h264_qsv", "medium", ["-global_quality", "23"]),
+    ("h264_videotoolbox", "medium", ["-b:v", "8M"]),
+)
+
+
+@lru_cache(maxsize=1)
+def _pick_encoder() -> Tuple[str, str, list]:
+    """
+    Picks the fastest working H.264 encoder, probed once per process.
+
+    Returns:
+        (codec, preset, ffmpeg_params) for write_videofile; libx264 if no
+        hardware encoder works
+    """
+    from moviepy.config import get_setting
+
+    ffmpeg = get_setting("FFMPEG_BINARY")
+    try:
+        listed = subprocess.run(
+            [ffmpeg, "-hide_banner", "-encoders"],
+            capture_output=True, text=True, timeout=10
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        listed = ""
+
+    for codec, preset, params in _HW_ENCODERS:
+        if codec not in listed:
+            continue
+        # moviepy only sets yuv420p for libx264, players need it everywhere
+        params = params + ["-pix_fmt", "yuv420p"]
+        # Listed only means compiled in; a tiny test encode with the real
+        # preset and params proves the device accepts them
+        try:
+            probe = subprocess.run(
+                [ffmpeg, "-hide_banner", "-loglevel", "error",
+                 "-f", "lavfi", "-i", "color=s=256x256:d=0.1",
+                 "-c:v", codec, "-preset", preset, *params, "-f", "null", "-"],
+                capture_output=True, timeout=30
+            )
+        except (OSError, subprocess.SubprocessError):
+            continue
+        if probe.returncode == 0:
+            print(f"🚀 Using hardware encoder: {codec}")
+            return codec, preset, params
+
+    # Shorts are re-encoded by YouTube anyway: trade a little x264
+    # efficiency for a several times faster CPU encode
+    return "libx264", "veryfast", []
+
+
+def _intermediate_codec_args() -> list:
+    """
+    ffmpeg video codec args for background copies that get encoded again
+    by the final compose, near-lossless with libx264.
+    """
+    codec, preset, params = _pick_encoder()
+    if codec == "libx264":
+        params = params + ["-crf", "18"]
+    if "-pix_fmt" not in params:
+        params = params + ["-pix_fmt", "yuv420p"]
+    return ["-c:v", codec, "-preset", preset, *params]
+
+
+@lru_cache(maxsize=8)
+def _list_backgrounds(directory: str, mtime_ns: int) -> Tuple[str, ...]:
+    """Video files in a directory; mtime_ns is only part of the cache key."""
+    video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+    return tuple(
+        str(f) for f in sorted(Path(directory).iterdir())
+        if f.suffix.lower() in video_extensions
+    )
+
+
+@lru_cache(maxsize=16)
+def _rounded_coverage(width: int, height: int, radius: int) -> np.ndarray:
+    """
+    Antialiased coverage of a rounded rectangle, 0..1 per pixel.
+
+    Each pixel centre's distance to the nearest corner circle (zero along
+    the straight edges) gives a one-pixel soft edge instead of the jagged
+    pieslice corners.
+    """
+    xs = np.arange(width, dtype=np.float32) + 0.5
+    ys = np.arange(height, dtype=np.float32) + 0.5
+    dx = np.maximum(np.maximum(radius - xs, xs - (width - radius)), 0)
+    dy = np.maximum(np.maximum(radius - ys, ys - (height - radius)), 0)
+    dist = np.hypot(dx[None, :], dy[:, None])
+    return np.clip(radius - dist + 0.5, 0, 1)
+
+
+@lru_cache(maxsize=8)
+def _gradient_avatar(size: int, accent: tuple) -> Image.Image:
+    """
+    Renders the avatar disk: brightest at the centre, fading to the accent colour.
+
+    Same rings as drawing `size` ellipses each inset by i//4 (innermost
+    wins), computed in one pass over the pixels.
+    """
+    # PIL ellipse boxes are inclusive, so the outer disk spans size + 1 pixels
+    # and covers pixel centres up to half a pixel past the nominal radius
+    span = size + 1
+    yy, xx = np.ogrid[:span, :span]
+    centre = size / 2
+    outer = size / 2 + 0.5
+    radius = np.hypot(xx - centre, yy - centre)
+
+    # Innermost ellipse index i that still covers each pixel
+    ring = np.clip(np.floor(outer - radius), 0, None).astype(np.int32)
+    i = np.minimum(ring * 4 + 3, size - 1)
+
+    rgba = np.empty((span, span, 4), dtype=np.uint8)
+    rgba[..., 0] = np.minimum(255, accent[0] + i)
+    rgba[..., 1] = np.minimum(255, accent[1] + i // 2)
+    rgba[..., 2] = min(255, accent[2])
+    rgba[..., 3] = np.where(radius <= outer, 255, 0)
+    return Image.fromarray(rgba, "RGBA")
+
+
+@lru_cache(maxsize=4096)
+def _text_length(font: ImageFont.ImageFont, text: str) -> float:
+    """Rendered advance width of text; words repeat across cards."""
+    return font.getlength(text)
+
+
+@lru_cache(maxsize=256)
+def _wrap_pixels(text: str, font: ImageFont.ImageFont, max_width: int) -> Tuple[str, ...]:
+    """
+    Greedy word wrap by rendered pixel width instead of character count.
+
+    Memoized per paragraph, so every progressively revealed card re-uses
+    the wrapping of the paragraphs before it.
+    """
+    space = _text_length(font, " ")
+    lines, line, line_width = [], [], 0.0
+
+    for word in text.split():
+        width = _text_length(font, word)
+
+        # Hard-break words wider than the card, like TextWrapper did
+        while width > max_width and len(word) > 1:
+            cut = len(word) - 1
+            while cut > 1 and font.getlength(word[:cut]) > max_width:
+                cut -= 1
+            if line:
+                lines.append(" ".join(line))
+                line, line_width = [], 0.0
+            lines.append(word[:cut])
+            word = word[cut:]
+            width = _text_length(font, word)
+
+        if line and line_width + space + width > max_width:
+            lines.append(" ".join(line))
+            line, line_width = [], 0.0
+        if line:
+            line_width += space
+        line.append(word)
+        line_width += width
+
+    if line:
+        lines.append(" ".join(line))
+    return tuple(lines)
+
+
+@lru_cache(maxsize=512)
+def _line_mask(line: str, font: ImageFont.ImageFont) -> Tuple[np.ndarray, int]:
+    """
+    Rasterizes one line of text to an 8-bit coverage mask.
+
+    Returns:
+        (mask, x offset of the mask relative to the draw position)
+    """
+    left, _, right, bottom = font.getbbox(line)
+    left = min(left, 0)
+    img = Image.new("L", (max(right - left, 1), max(bottom, 1)))
+    ImageDraw.Draw(img).text((-left, 0), line, font=font, fill=255)
+    return np.asarray(img), left
+
+
+def _blend_ink(canvas: np.ndarray, mask: np.ndarray, dx: int, x: int, y: int, color: tuple):
+    """Blends opaque ink into an RGBA canvas through a coverage mask, like ImageDraw.text."""
+    region = canvas[y:y + mask.shape[0], x + dx:x + dx + mask.shape[1]]
+    alpha = mask[:region.shape[0], :region.shape[1], None].astype(np.uint32)
+    ink = np.array(tuple(color) + (255,), dtype=np.uint32)
+    region[:] = (region * (255 - alpha) + ink * alpha + 127) // 255
+
+
+class _CardClip(ImageClip):
+    """
+    ImageClip for an RGBA card with a precomputed integer blit.
+
+    MoviePy's generic blit turns the mask into floats and blends the whole
+    card in float64 every frame. The card never changes, so its
+    premultiplied colour and inverse alpha are computed once, as uint8,
+    and each frame is a single multiply per channel over the card's
+    rectangle.
+    """
+
+    def __init__(self, card: np.ndarray):
+        super().__init__(card[..., :3], transparent=False)
+        alpha = card[..., 3:].astype(np.uint16)
+        self._premultiplied = ((card[..., :3] * alpha + 127) // 255).astype(np.uint8)
+        self._inverse_alpha = (255 - card[..., 3:]).astype(np.uint8)
+        # (x, y, frame size) -> clipped blit geometry, constant per video
+        self._plans = {}
+
+    def _blit_plan(self, x: int, y: int, frame_h: int, frame_w: int) -> Optional[tuple]:
+        """
+        Works out once which part of the card lands inside the frame.
+
+        Returns:
+            (frame slice, premultiplied colour, inverse alpha) cropped to
+            the visible area, or None if the card is off-frame
+        """
+        key = (x, y, frame_h, frame_w)
+        if key not in self._plans:
+            h, w = self._inverse_alpha.shape[:2]
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + w, frame_w), min(y + h, frame_h)
+            if x0 >= x1 or y0 >= y1:
+                self._plans[key] = None
+            else:
+                card_area = np.s_[y0 - y:y1 - y, x0 - x:x1 - x]
+                self._plans[key] = (
+                    np.s_[y0:y1, x0:x1],
+                    self._premultiplied[card_area],
+                    self._inverse_alpha[card_area]
+                )
+        return self._plans[key]
+
+    def blit_on(self, picture: np.ndarray, t: float) -> np.ndarray:
+        x, y = map(int, self.pos(t - self.start))
+        plan = self._blit_plan(x, y, *picture.shape[:2])
+        if plan is None:
+            return picture
+        frame_area, premultiplied, inverse_alpha = plan
+
+        # Readers hand out their last frame again, so never blend in place
+        out = picture.copy()
+        region = out[frame_area]
+
+        # dst*(255-a)/255 + premultiplied colour, in one uint16 scratch buffer
+        blended = np.multiply(region, inverse_alpha, dtype=np.uint16)
+        blended += 127
+        blended //= 255
+        blended += premultiplied
+        region[:] = blended
+        return out
+
+
 @dataclass
 class VideoConfig:
     """Configuration for video generation."""
@@ -46,6 +304,21 @@ class VideoConfig:
 class VideoComposer:
     """Composes videos with realistic tweet-style text cards."""
 
+    # Card layout (pixels)
+    CARD_LINE_HEIGHT = 62
+    CARD_PADDING = 40
+    CARD_HEADER_HEIGHT = 90
+    CARD_FOOTER_HEIGHT = 70
+    CARD_SHADOW_OFFSET = 8
+
+    # Narration formats muxed into the MP4 without re-encoding
+    COPYABLE_AUDIO = {".mp3", ".m4a", ".aac"}
+
+    # Pre-scaled backgrounds: only the opening seconds a Short can use,
+    # for the few most recently used files
+    BG_CACHE_SECONDS = 65.0
+    BG_CACHE_ENTRIES = 4
+
     def __init__(
         self,
         backgrounds_dir: str = "assets/backgrounds",
@@ -56,8 +329,18 @@ class VideoComposer:
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.config = config or VideoConfig()
+        # Outside the repo, so runs add no untracked files under assets/
+        self._bg_cache_dir = (
+            Path(tempfile.gettempdir())
+            / f"reddit_bot_bg_{self.config.width}x{self.config.height}"
+        )
         self.font_path = self._find_font()
         self.font_bold_path = self._find_font(bold=True)
+        self._fonts = self._load_fonts()
+        # Text-independent card parts, keyed by user/stats
+        self._chrome_cache: dict[tuple, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        # Concurrent pipelines render on executor threads sharing this composer
+        self._chrome_lock = threading.Lock()
 
         # Import title generator for usernames
         try:
@@ -88,26 +371,146 @@ class VideoComposer:
                 return font
         return candidates[0]
 
+    def _load_fonts(self) -> dict:
+        """Parses every font the card uses once, instead of once per card."""
+        try:
+            fonts = {
+                "name": ImageFont.truetype(self.font_bold_path, 42),
+                "handle": ImageFont.truetype(self.font_path, 36),
+                "text": ImageFont.truetype(self.font_path, 48),
+                "text_bold": ImageFont.truetype(self.font_bold_path, 48),
+                "stats": ImageFont.truetype(self.font_path, 32),
+            }
+        except:
+            default = ImageFont.load_default()
+            fonts = dict.fromkeys(("name", "handle", "text", "text_bold", "stats"), default)
+
+        try:
+            fonts["letter"] = ImageFont.truetype(self.font_bold_path, 28)
+        except:
+            fonts["letter"] = fonts["name"]
+
+        if os.path.exists(self.font_bold_path):
+            fonts["check"] = ImageFont.truetype(self.font_bold_path, 16)
+        else:
+            fonts["check"] = fonts["stats"]
+
+        return fonts
+
     def get_random_background(self) -> str:
         """Gets a random background video."""
-        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
-        backgrounds = [
-            f for f in self.backgrounds_dir.iterdir()
-            if f.suffix.lower() in video_extensions
-        ]
+        # Re-listed only when the directory's mtime changes
+        backgrounds = _list_backgrounds(
+            str(self.backgrounds_dir), self.backgrounds_dir.stat().st_mtime_ns
+        )
         if not backgrounds:
             raise FileNotFoundError(f"No background videos found in {self.backgrounds_dir}")
-        return str(random.choice(backgrounds))
+        return random.choice(backgrounds)
 
-    def _get_user_info(self) -> Tuple[str, str, str, str, str]:
-        """Gets user info (name, handle, likes, retweets, comments)."""
-        if self.title_gen:
+    def _cached_background(self, background_path: str, duration: float) -> str:
+        """
+        Returns the background's opening BG_CACHE_SECONDS, already cropped and
+        scaled to the output size and frame rate, transcoding on first use.
+
+        Keyed on path, size and mtime, so a replaced file is prepared again.
+        Only BG_CACHE_ENTRIES copies are kept (least recently used go first).
+        Falls back to the original file if the video is longer than the
+        cached span or the transcode fails.
+        """
+        if duration > self.BG_CACHE_SECONDS:
+            return background_path
+
+        from moviepy.config import get_setting
+
+        cfg = self.config
+        stat = os.stat(background_path)
+        key = hashlib.blake2b(
+            f"{os.path.abspath(background_path)}|{stat.st_size}|{stat.st_mtime_ns}|"
+            f"{cfg.fps}|{self.BG_CACHE_SECONDS}".encode(),
+            digest_size=16
+        ).hexdigest()
+        cached_path = self._bg_cache_dir / f"{key}.mp4"
+
+        try:
+            # Touch on hit: eviction goes by mtime
+            os.utime(cached_path)
+            return str(cached_path)
+        except OSError:
+            pass
+
+        print(f"🎞️ Pre-scaling background {Path(background_path).name}...")
+        tmp_path = None
+        try:
+            self._bg_cache_dir.mkdir(parents=True, exist_ok=True)
+            # Unique temp name, concurrent pipelines may prepare the same file
+            fd, tmp_path = tempfile.mkstemp(suffix=".mp4", dir=self._bg_cache_dir)
+            os.close(fd)
+            subprocess.run(
+                [
+                    get_setting("FFMPEG_BINARY"), "-y", "-hide_banner", "-loglevel", "error",
+                    "-i", background_path, "-t", f"{self.BG_CACHE_SECONDS:.3f}", "-an",
+                    "-vf", self._scale_filter(), *_intermediate_codec_args(),
+                    tmp_path,
+                ],
+                check=True, capture_output=True
+            )
+            os.replace(tmp_path, cached_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"⚠️ Background pre-scale failed, using original: {e}")
+            if tmp_path:
+                Path(tmp_path).unlink(missing_ok=True)
+            return background_path
+
+        self._trim_background_cache()
+        return str(cached_path)
+
+    def _trim_background_cache(self):
+        """Deletes the least recently used pre-scaled backgrounds over the limit."""
+        entries = []
+        with os.scandir(self._bg_cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".mp4") and not entry.name.startswith("tmp"):
+                    try:
+                        entries.append((entry.stat().st_mtime_ns, entry.path))
+                    except OSError:
+                        continue
+        entries.sort(reverse=True)
+        for _, path in entries[self.BG_CACHE_ENTRIES:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _scale_filter(self) -> str:
+        """ffmpeg filter chain that center-crops and scales to the output frame."""
+        cfg = self.config
+        return (
+            f"scale={cfg.width}:{cfg.height}:force_original_aspect_ratio=increase,"
+            f"crop={cfg.width}:{cfg.height},setsar=1,fps={cfg.fps}"
+        )
+
+    def _get_user_info(
+        self,
+        display_name: Optional[str] = None,
+        handle: Optional[str] = None
+    ) -> Tuple[str, str, str, str, str, str]:
+        """
+        Gets user info (name, handle, likes, retweets, comments, views).
+        A username passed in by the caller skips the Groq request.
+        """
+        if display_name and handle:
+            name = display_name
+        elif self.title_gen:
             name, handle = self.title_gen.generate_username()
-            likes, rts, comments = self.title_gen.generate_engagement_stats()
         else:
             name, handle = "JokeMaster", "@joke_master"
+
+        if self.title_gen:
+            likes, rts, comments = self.title_gen.generate_engagement_stats()
+        else:
             likes, rts, comments = "24.5K", "5.2K", "1.8K"
-        return name, handle, likes, rts, comments
+        views = f"{random.randint(100, 500)}K"
+        return name, handle, likes, rts, comments, views
 
     def create_tweet_card(
         self,
@@ -117,60 +520,151 @@ class VideoComposer:
         likes: str,
         retweets: str,
         comments: str,
-        highlight_last: bool = False
+        highlight_last: bool = False,
+        views: Optional[str] = None
     ) -> Image.Image:
-        """Creates a realistic tweet-style card."""
-        cfg = self.config
+        """
+        Creates a realistic tweet-style card.
 
-        # Load fonts
-        try:
-            font_name = ImageFont.truetype(self.font_bold_path, 42)
-            font_handle = ImageFont.truetype(self.font_path, 36)
-            font_text = ImageFont.truetype(self.font_path, 48)
-            font_text_bold = ImageFont.truetype(self.font_bold_path, 48)
-            font_stats = ImageFont.truetype(self.font_path, 32)
-        except:
-            font_name = font_handle = font_text = font_text_bold = font_stats = ImageFont.load_default()
+        Pass the same views for every card of a video; a random count is
+        drawn if omitted.
+        """
+        cfg = self.config
+        fonts = self._fonts
 
-        # Wrap text into lines
-        wrapper = textwrap.TextWrapper(width=32)
+        # Wrap text into lines that fit the card's text column
+        max_width = cfg.card_width - self.CARD_PADDING * 2
         lines = []
         for paragraph in text.split('\n'):
             if paragraph.strip():
-                wrapped = wrapper.wrap(paragraph.strip())
-                lines.extend(wrapped)
+                lines.extend(_wrap_pixels(paragraph.strip(), fonts["text"], max_width))
 
         # Calculate dimensions
-        line_height = 62
-        padding = 40
-        header_height = 90
-        text_height = max(len(lines) * line_height, 120)
-        footer_height = 70
-        total_height = header_height + text_height + footer_height + padding * 2
+        text_height = max(len(lines) * self.CARD_LINE_HEIGHT, 120)
+        total_height = self._card_height(text_height)
+        shadow_offset = self.CARD_SHADOW_OFFSET
+        full_height = total_height + shadow_offset * 2
+
+        # Only the text changes between cards: stitch the
+        # cached top/bottom chrome around copies of a plain body row
+        if views is None:
+            views = f"{random.randint(100, 500)}K"
+        top, body_row, bottom = self._card_chrome(
+            display_name, handle, likes, retweets, comments, views
+        )
+        card = np.empty((full_height, top.shape[1], 4), dtype=np.uint8)
+        card[:len(top)] = top
+        card[len(top):full_height - len(bottom)] = body_row
+        card[full_height - len(bottom):] = bottom
+
+        # Draw text content from memoized line rasters: each card repeats
+        # every line of the card before it
+        x_start = shadow_offset + self.CARD_PADDING
+        y_pos = shadow_offset + self.CARD_PADDING + self.CARD_HEADER_HEIGHT
+        for i, line in enumerate(lines):
+            is_last_line = i == len(lines) - 1
+
+            if highlight_last and is_last_line:
+                _blend_ink(card, *_line_mask(line, fonts["text_bold"]), x_start, y_pos, cfg.accent_color)
+            else:
+                _blend_ink(card, *_line_mask(line, fonts["text"]), x_start, y_pos, cfg.text_color)
+            y_pos += self.CARD_LINE_HEIGHT
+
+        return Image.fromarray(card, 'RGBA')
+
+    def _card_height(self, text_height: int) -> int:
+        """Card height (without shadow) for a given text block height."""
+        return (
+            self.CARD_HEADER_HEIGHT + text_height + self.CARD_FOOTER_HEIGHT
+            + self.CARD_PADDING * 2
+        )
+
+    def _card_chrome(
+        self,
+        display_name: str,
+        handle: str,
+        likes: str,
+        retweets: str,
+        comments: str,
+        views: str
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gets the parts of a card that don't depend on its text.
+
+        Returns:
+            (top rows through the header, one plain body row, bottom rows
+            from the footer down) as RGBA arrays, cached per user/stats
+        """
+        key = (display_name, handle, likes, retweets, comments, views)
+        with self._chrome_lock:
+            chrome = self._chrome_cache.get(key)
+        if chrome is None:
+            # Shortest card (120 px of text area) has the same top and bottom
+            template = np.asarray(self._draw_card_frame(
+                self._card_height(120), display_name, handle, likes, retweets, comments, views
+            ))
+            top_height = self.CARD_SHADOW_OFFSET + self.CARD_PADDING + self.CARD_HEADER_HEIGHT
+            bottom_height = self.CARD_FOOTER_HEIGHT + self.CARD_SHADOW_OFFSET
+            chrome = (
+                template[:top_height].copy(),
+                template[top_height].copy(),
+                template[-bottom_height:].copy()
+            )
+
+            # Drawn outside the lock; a racing thread at worst draws it twice
+            with self._chrome_lock:
+                if len(self._chrome_cache) >= 8:
+                    self._chrome_cache.pop(next(iter(self._chrome_cache)))
+                self._chrome_cache[key] = chrome
+        return chrome
+
+    def _draw_card_frame(
+        self,
+        total_height: int,
+        display_name: str,
+        handle: str,
+        likes: str,
+        retweets: str,
+        comments: str,
+        views: str
+    ) -> Image.Image:
+        """Draws a card with shadow, header and footer stats but no text."""
+        cfg = self.config
+
+        fonts = self._fonts
+        font_name = fonts["name"]
+        font_handle = fonts["handle"]
+        font_stats = fonts["stats"]
+
+        padding = self.CARD_PADDING
+        footer_height = self.CARD_FOOTER_HEIGHT
 
         # Create card with shadow
-        shadow_offset = 8
+        shadow_offset = self.CARD_SHADOW_OFFSET
         full_width = cfg.card_width + shadow_offset * 2
         full_height = total_height + shadow_offset * 2
 
-        # Create image with transparency
-        img = Image.new('RGBA', (full_width, full_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
+        # Rounded rects come from one cached antialiased coverage mask
+        # (PIL-style inclusive boxes, hence the +1)
+        coverage = _rounded_coverage(cfg.card_width + 1, total_height + 1, cfg.card_radius)
 
         # Draw shadow
-        shadow_color = (0, 0, 0, 40)
-        self._draw_rounded_rect(
-            draw,
-            (shadow_offset + 4, shadow_offset + 4,
-             cfg.card_width + shadow_offset + 4, total_height + shadow_offset + 4),
-            cfg.card_radius,
-            shadow_color
-        )
+        shadow = np.zeros((full_height, full_width, 4), dtype=np.uint8)
+        shadow_alpha = shadow[shadow_offset + 4:shadow_offset + 4 + coverage.shape[0],
+                              shadow_offset + 4:shadow_offset + 4 + coverage.shape[1], 3]
+        shadow_alpha[:] = np.rint(coverage[:shadow_alpha.shape[0], :shadow_alpha.shape[1]] * 40)
 
         # Draw main card
-        card_rect = (shadow_offset, shadow_offset,
-                     cfg.card_width + shadow_offset, total_height + shadow_offset)
-        self._draw_rounded_rect(draw, card_rect, cfg.card_radius, cfg.card_bg_color + (255,))
+        card = np.zeros((full_height, full_width, 4), dtype=np.uint8)
+        card_area = card[shadow_offset:shadow_offset + coverage.shape[0],
+                         shadow_offset:shadow_offset + coverage.shape[1]]
+        card_area[..., :3] = cfg.card_bg_color
+        card_area[..., 3] = np.rint(coverage * 255)
+
+        img = Image.alpha_composite(
+            Image.fromarray(shadow, 'RGBA'), Image.fromarray(card, 'RGBA')
+        )
+        draw = ImageDraw.Draw(img)
 
         # Starting positions
         x_start = shadow_offset + padding
@@ -182,26 +676,12 @@ class VideoComposer:
         avatar_y = y_pos
 
         # Create gradient avatar
-        for i in range(avatar_size):
-            alpha = int(255 * (1 - i / avatar_size * 0.3))
-            color = (
-                min(255, cfg.accent_color[0] + i),
-                min(255, cfg.accent_color[1] + i // 2),
-                min(255, cfg.accent_color[2]),
-                alpha
-            )
-            draw.ellipse(
-                [avatar_x + i//4, avatar_y + i//4,
-                 avatar_x + avatar_size - i//4, avatar_y + avatar_size - i//4],
-                fill=color[:3]
-            )
+        avatar = _gradient_avatar(avatar_size, tuple(cfg.accent_color))
+        img.paste(avatar, (avatar_x, avatar_y), avatar)
 
         # Draw letter in avatar
         letter = display_name[0].upper() if display_name else "U"
-        try:
-            letter_font = ImageFont.truetype(self.font_bold_path, 28)
-        except:
-            letter_font = font_name
+        letter_font = fonts["letter"]
         bbox = draw.textbbox((0, 0), letter, font=letter_font)
         letter_w = bbox[2] - bbox[0]
         letter_h = bbox[3] - bbox[1]
@@ -226,22 +706,11 @@ class VideoComposer:
             fill=cfg.accent_color
         )
         # Checkmark
-        draw.text((badge_x + 4, badge_y + 1), "✓", font=ImageFont.truetype(self.font_bold_path, 16) if os.path.exists(self.font_bold_path) else font_stats, fill=(255, 255, 255))
+        draw.text((badge_x + 4, badge_y + 1), "✓", font=fonts["check"], fill=(255, 255, 255))
 
         # Handle
         draw.text((name_x, y_pos + 38), handle, font=font_handle, fill=cfg.secondary_color)
 
-        # Draw text content
-        y_pos = shadow_offset + padding + header_height
-        for i, line in enumerate(lines):
-            is_last_line = i == len(lines) - 1
-
-            if highlight_last and is_last_line:
-                draw.text((x_start, y_pos), line, font=font_text_bold, fill=cfg.accent_color)
-            else:
-                draw.text((x_start, y_pos), line, font=font_text, fill=cfg.text_color)
-            y_pos += line_height
-
         # Draw footer with engagement stats
         footer_y = total_height + shadow_offset - footer_height + 10
         stat_x = x_start
@@ -263,43 +732,42 @@ class VideoComposer:
         # Views/Share
         stat_x += 140
         draw.text((stat_x, footer_y), "📊", font=font_stats, fill=cfg.secondary_color)
-        views = f"{random.randint(100, 500)}K"
         draw.text((stat_x + 35, footer_y), views, font=font_stats, fill=cfg.secondary_color)
 
         return img
 
-    def _draw_rounded_rect(self, draw, coords, radius, fill):
-        """Draws a rounded rectangle."""
-        x1, y1, x2, y2 = coords
-        draw.rectangle([x1 + radius, y1, x2 - radius, y2], fill=fill)
-        draw.rectangle([x1, y1 + radius, x2, y2 - radius], fill=fill)
-        draw.pieslice([x1, y1, x1 + 2*radius, y1 + 2*radius], 180, 270, fill=fill)
-        draw.pieslice([x2 - 2*radius, y1, x2, y1 + 2*radius], 270, 360, fill=fill)
-        draw.pieslice([x1, y2 - 2*radius, x1 + 2*radius, y2], 90, 180, fill=fill)
-        draw.pieslice([x2 - 2*radius, y2 - 2*radius, x2, y2], 0, 90, fill=fill)
-
-    def create_tweet_clips(
+    def render_tweet_cards(
         self,
         segments: list[TTSSegment],
         total_duration: float,
-        full_text: str
-    ) -> list[ImageClip]:
-        """Creates tweet card clips that reveal text progressively."""
-        clips = []
-        cfg = self.config
+        display_name: Optional[str] = None,
+        handle: Optional[str] = None
+    ) -> list[Tuple[Image.Image, float, float]]:
+        """
+        Renders one progressively revealed tweet card per segment.
+
+        Returns:
+            (card image, start time, duration) for each segment
+        """
+        cards = []
 
         # Get user info once for consistency
-        name, handle, likes, rts, comments = self._get_user_info()
+        name, handle, likes, rts, comments, views = self._get_user_info(display_name, handle)
 
-        accumulated_text = ""
-        for i, segment in enumerate(segments):
-            accumulated_text += segment.text + "\n"
-            is_last = i == len(segments) - 1
+        # Text revealed so far, one paragraph per segment
+        prefixes = itertools.accumulate(
+            (segment.text for segment in segments),
+            lambda revealed, text: revealed + "\n" + text
+        )
+        # Each card shows until the next segment starts, the last until the end
+        starts = np.fromiter(
+            (segment.start_time for segment in segments), dtype=np.float64, count=len(segments)
+        )
+        durations = np.diff(starts, append=total_duration)
 
-            if i + 1 < len(segments):
-                duration = segments[i + 1].start_time - segment.start_time
-            else:
-                duration = total_duration - segment.start_time
+        timings = zip(starts.tolist(), durations.tolist())
+        for i, (accumulated_text, (start, duration)) in enumerate(zip(prefixes, timings)):
+            is_last = i == len(segments) - 1
 
             card_img = self.create_tweet_card(
                 text=accumulated_text.strip(),
@@ -308,41 +776,93 @@ class VideoComposer:
                 likes=likes,
                 retweets=rts,
                 comments=comments,
-                highlight_last=is_last
+                highlight_last=is_last,
+                views=views
             )
+            cards.append((card_img, start, duration))
+
+        return cards
+
+    def _card_position(self, card_img: Image.Image) -> Tuple[int, int]:
+        """Top-left corner that centers a card in the frame."""
+        return (
+            (self.config.width - card_img.width) // 2,
+            (self.config.height - card_img.height) // 2
+        )
+
+    def create_tweet_clips(
+        self,
+        segments: list[TTSSegment],
+        total_duration: float,
+        display_name: Optional[str] = None,
+        handle: Optional[str] = None
+    ) -> list[ImageClip]:
+        """Creates tweet card clips that reveal text progressively."""
+        return self._clips_from_cards(
+            self.render_tweet_cards(segments, total_duration, display_name, handle)
+        )
+
+    def _clips_from_cards(
+        self,
+        cards: list[Tuple[Image.Image, float, float]]
+    ) -> list[ImageClip]:
+        """Wraps rendered cards as positioned, timed card clips."""
+        clips = []
 
-            card_array = np.array(card_img)
-            clip = ImageClip(card_array)
+        for card_img, start, duration in cards:
+            # Read-only view of the image buffer, the clip never writes to it
+            clip = _CardClip(np.asarray(card_img))
             clip = clip.set_duration(duration)
-            clip = clip.set_start(segment.start_time)
+            clip = clip.set_start(start)
 
             # Center the card
-            card_x = (cfg.width - card_img.width) // 2
-            card_y = (cfg.height - card_img.height) // 2
-            clip = clip.set_position((card_x, card_y))
+            clip = clip.set_position(self._card_position(card_img))
 
             clips.append(clip)
 
         return clips
 
-    def prepare_background(self, background_path: str, target_duration: float) -> VideoFileClip:
-        """Prepares background video."""
+    def prepare_background(
+        self,
+        background_path: str,
+        target_duration: float,
+        work_dir: Optional[str] = None
+    ) -> VideoFileClip:
+        """
+        Prepares background video.
+
+        Looping, cropping and scaling all happen in at most one ffmpeg run,
+        so MoviePy only reads frames that are already output-sized.
+
+        Args:
+            background_path: Source video
+            target_duration: Length the clip must cover
+            work_dir: Where a looped or scaled copy is written if needed;
+                the caller removes it after closing the clip (a fresh temp
+                dir if omitted)
+        """
+        cfg = self.config
         clip = VideoFileClip(background_path)
-        clip_w, clip_h = clip.size
-        target_ratio = self.config.width / self.config.height
-
-        if clip_w / clip_h > target_ratio:
-            new_width = int(clip_h * target_ratio)
-            clip = crop(clip, x_center=clip_w/2, y_center=clip_h/2, width=new_width, height=clip_h)
-        else:
-            new_height = int(clip_w / target_ratio)
-            clip = crop(clip, x_center=clip_w/2, y_center=clip_h/2, width=clip_w, height=new_height)
-
-        clip = resize(clip, (self.config.width, self.config.height))
-
-        if clip.duration < target_duration:
-            n_loops = int(target_duration / clip.duration) + 1
-            clip = concatenate_videoclips([clip] * n_loops)
+        needs_loop = clip.duration < target_duration
+        needs_scale = tuple(clip.size) != (cfg.width, cfg.height)
+
+        if needs_loop or needs_scale:
+            clip.close()
+            from moviepy.config import get_setting
+
+            work_dir = work_dir or tempfile.mkdtemp(prefix="bg_")
+            prepared_path = os.path.join(work_dir, "bg_prepared.mp4")
+            cmd = [get_setting("FFMPEG_BINARY"), "-y", "-hide_banner", "-loglevel", "error"]
+            if needs_loop:
+                cmd += ["-stream_loop", "-1"]
+            cmd += ["-i", background_path, "-t", f"{target_duration + 1.0:.3f}", "-an"]
+            if needs_scale:
+                cmd += ["-vf", self._scale_filter(), *_intermediate_codec_args()]
+            else:
+                # Already output-sized: loop by stream copy
+                cmd += ["-c", "copy"]
+            subprocess.run(cmd + [prepared_path], check=True, capture_output=True)
+            clip = VideoFileClip(prepared_path)
 
         clip = clip.subclip(0, target_duration)
         clip = clip.without_audio()
@@ -355,9 +875,22 @@ class VideoComposer:
         background_path: Optional[str] = None,
         sound_effect_path: Optional[str] = None,
         sound_effect_time: Optional[float] = None,
-        full_text: str = ""
+        background_music_path: Optional[str] = None,
+        music_volume_db: float = -15.0,
+        display_name: Optional[str] = None,
+        handle: Optional[str] = None
     ) -> str:
-        """Composes the final video with tweet-style overlay."""
+        """
+        Composes the final video with tweet-style overlay.
+
+        Sound effect and background music are mixed here, in the same
+        ffmpeg pass that encodes the video, so the TTS audio never needs
+        a separate mix-and-re-encode step.
+
+        Cards only change at segment boundaries, so ffmpeg overlays the
+        pre-rendered PNGs itself; the MoviePy frame-by-frame composite is
+        only used if that direct ffmpeg run fails.
+        """
 
         # Minimum 10 seconds
         min_duration = 10.0
@@ -366,9 +899,37 @@ class VideoComposer:
 
         if background_path is None:
             background_path = self.get_random_background()
+        background_path = self._cached_background(background_path, total_duration)
 
-        background = self.prepare_background(background_path, total_duration)
-        tweet_clips = self.create_tweet_clips(tts_result.segments, total_duration, full_text)
+        output_path = self.output_dir / output_filename
+
+        if sound_effect_time is None and tts_result.segments:
+            sound_effect_time = tts_result.segments[-1].start_time
+        if not (sound_effect_path and os.path.exists(sound_effect_path)):
+            sound_effect_path = None
+        if not (background_music_path and os.path.exists(background_music_path)):
+            background_music_path = None
+
+        cards = self.render_tweet_cards(
+            tts_result.segments, total_duration, display_name, handle
+        )
+
+        try:
+            self._compose_with_ffmpeg(
+                cards, background_path, tts_result.audio_file, output_path,
+                total_duration, sound_effect_path, sound_effect_time,
+                background_music_path, music_volume_db
+            )
+            return str(output_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            detail = getattr(e, "stderr", None) or b""
+            print(f"⚠️ Direct ffmpeg render failed, falling back to MoviePy: {e}")
+            if detail:
+                print(detail.decode(errors="replace").strip()[-500:])
+
+        work_dir = tempfile.mkdtemp(prefix="bg_")
+        background = self.prepare_background(background_path, total_duration, work_dir)
+        tweet_clips = self._clips_from_cards(cards)
 
         video_layers = [background] + tweet_clips
         final_video = CompositeVideoClip(video_layers)
@@ -376,34 +937,159 @@ class VideoComposer:
         tts_audio = AudioFileClip(tts_result.audio_file)
         audio_clips = [tts_audio]
 
-        if sound_effect_path and os.path.exists(sound_effect_path):
+        if sound_effect_path and sound_effect_time is not None:
             sfx = AudioFileClip(sound_effect_path)
-            if sound_effect_time is None and tts_result.segments:
-                sound_effect_time = tts_result.segments[-1].start_time
-            if sound_effect_time is not None:
-                sfx = sfx.set_start(sound_effect_time).volumex(0.5)
-                audio_clips.append(sfx)
+            sfx = sfx.set_start(sound_effect_time).volumex(0.5)
+            audio_clips.append(sfx)
+
+        if background_music_path:
+            music = AudioFileClip(background_music_path)
+            music = audio_loop(music, duration=total_duration)
+            music = music.volumex(10 ** (music_volume_db / 20))
+            music = audio_fadeout(audio_fadein(music, 1.0), 1.0)
+            audio_clips.append(music)
 
         final_audio = CompositeAudioClip(audio_clips)
         final_video = final_video.set_audio(final_audio)
         final_video = final_video.set_duration(total_duration)
 
-        output_path = self.output_dir / output_filename
+        codec, preset, ffmpeg_params = _pick_encoder()
         final_video.write_videofile(
             str(output_path),
             fps=self.config.fps,
-            codec='libx264',
+            codec=codec,
             audio_codec='aac',
-            preset='medium',
-            threads=4
+            preset=preset,
+            threads=4,
+            ffmpeg_params=ffmpeg_params or None
         )
 
         background.close()
-        tts_audio.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+        for clip in audio_clips:
+            clip.close()
         final_video.close()
 
         return str(output_path)
 
+    def _compose_with_ffmpeg(
+        self,
+        cards: list[Tuple[Image.Image, float, float]],
+        background_path: str,
+        audio_path: str,
+        output_path: Path,
+        total_duration: float,
+        sound_effect_path: Optional[str] = None,
+        sound_effect_time: Optional[float] = None,
+        background_music_path: Optional[str] = None,
+        music_volume_db: float = -15.0
+    ):
+        """
+        Renders the video in a single ffmpeg run with an overlay filtergraph.
+
+        Args:
+            cards: (card image, start, duration) from render_tweet_cards
+            background_path: Background video, looped to fill the duration
+            audio_path: TTS narration
+            output_path: Where to write the MP4
+            total_duration: Length of the output in seconds
+            sound_effect_path: Optional punchline sound effect
+            sound_effect_time: When the sound effect starts
+            background_music_path: Optional looped background music
+            music_volume_db: Background music gain
+
+        Raises:
+            subprocess.CalledProcessError: If ffmpeg fails
+        """
+        from moviepy.config import get_setting
+
+        codec, preset, params = _pick_encoder()
+
+        with tempfile.TemporaryDirectory(prefix="cards_") as tmp_dir:
+            cmd = [
+                get_setting("FFMPEG_BINARY"), "-y", "-hide_banner", "-loglevel", "error",
+                # Background loops until the output duration cuts it
+                "-stream_loop", "-1", "-i", background_path,
+            ]
+
+            # Center-crop to the target aspect ratio, then scale
+            filters = [
+                f"[0:v]{self._scale_filter()}[v0]"
+            ]
+            card_paths = [
+                os.path.join(tmp_dir, f"card_{i}.png") for i in range(1, len(cards) + 1)
+            ]
+            # zlib releases the GIL, so the PNGs encode in parallel; they are
+            # read once by ffmpeg, fast compression beats small files
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                list(pool.map(
+                    lambda card, path: card[0].save(path, compress_level=1),
+                    cards, card_paths
+                ))
+
+            for i, (card_img, start, duration) in enumerate(cards, 1):
+                cmd += ["-i", card_paths[i - 1]]
+
+                # A still input repeats its frame, enable picks its time window
+                x, y = self._card_position(card_img)
+                filters.append(
+                    f"[v{i - 1}][{i}:v]overlay=x={x}:y={y}:"
+                    f"enable='gte(t,{start:.3f})*lt(t,{start + duration:.3f})'[v{i}]"
+                )
+            video_label = f"[v{len(cards)}]"
+
+            audio_index = len(cards) + 1
+            cmd += ["-i", audio_path]
+            mix_inputs = [f"[{audio_index}:a]"]
+
+            if sound_effect_path and sound_effect_time is not None:
+                audio_index += 1
+                cmd += ["-i", sound_effect_path]
+                delay_ms = int(sound_effect_time * 1000)
+                filters.append(
+                    f"[{audio_index}:a]adelay=delays={delay_ms}:all=1,volume=0.5[sfx]"
+                )
+                mix_inputs.append("[sfx]")
+
+            if background_music_path:
+                audio_index += 1
+                cmd += ["-stream_loop", "-1", "-i", background_music_path]
+                gain = 10 ** (music_volume_db / 20)
+                fade_out = max(total_duration - 1.0, 0.0)
+                filters.append(
+                    f"[{audio_index}:a]volume={gain:.4f},afade=t=in:d=1,"
+                    f"afade=t=out:st={fade_out:.3f}:d=1[music]"
+                )
+                mix_inputs.append("[music]")
+
+            if len(mix_inputs) > 1:
+                # Plain sum like CompositeAudioClip (amix would scale each input down)
+                filters.append(
+                    "".join(mix_inputs)
+                    + f"amix=inputs={len(mix_inputs)}:duration=longest:normalize=0[aout]"
+                )
+                audio_label = "[aout]"
+                audio_codec = "aac"
+            else:
+                audio_label = f"{audio_index}:a"
+                # Nothing to mix: MP4 carries MP3/AAC as is, skip the re-encode
+                copyable = Path(audio_path).suffix.lower() in self.COPYABLE_AUDIO
+                audio_codec = "copy" if copyable else "aac"
+
+            if "-pix_fmt" not in params:
+                params = params + ["-pix_fmt", "yuv420p"]
+
+            cmd += [
+                "-filter_complex", ";".join(filters),
+                "-map", video_label, "-map", audio_label,
+                "-t", f"{total_duration:.3f}",
+                "-c:v", codec, "-preset", preset, *params,
+                "-c:a", audio_codec,
+                "-movflags", "+faststart",
+                str(output_path)
+            ]
+            subprocess.run(cmd, check=True, capture_output=True)
+
 
 if __name__ == "__main__":
     print("Video composer with tweet-style cards loaded!")
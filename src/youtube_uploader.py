@@ -11,7 +11,9 @@ from pathlib import Path
 from typing import Optional
 from datetime import datetime
 
+import httplib2
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
@@ -31,6 +33,10 @@ class YouTubeUploader:
         "#shorts", "#reddit", "#redditstories", "#funny",
         "#joke", "#comedy", "#viral", "#fyp"
     ]
+    HASHTAG_LINE = " ".join(DEFAULT_HASHTAGS)
+
+    # Tags added to every upload
+    EXTRA_TAGS = ("reddit", "shorts", "funny", "jokes", "comedy")
 
     def __init__(
         self,
@@ -48,6 +54,16 @@ class YouTubeUploader:
         self.token_file = token_file
         self.youtube = None
 
+    def _build_client(self, creds: Credentials):
+        """
+        Builds the API client on one keep-alive httplib2 connection.
+
+        AuthorizedHttp refreshes expired tokens on its own, so the client
+        and its open TLS connection are reused for every later upload.
+        """
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=60))
+        self.youtube = build('youtube', 'v3', http=http)
+
     def authenticate(self) -> bool:
         """
         Authenticates with YouTube API.
@@ -92,7 +108,7 @@ class YouTubeUploader:
                 token.write(creds.to_json())
 
         # Build YouTube API client
-        self.youtube = build('youtube', 'v3', credentials=creds)
+        self._build_client(creds)
         return True
 
     def authenticate_with_env(self) -> bool:
@@ -108,6 +124,10 @@ class YouTubeUploader:
         Returns:
             True if authentication successful
         """
+        if self.youtube is not None:
+            # Already connected: keep the client and its connection
+            return True
+
         client_id = os.getenv('YOUTUBE_CLIENT_ID', '').strip()
         client_secret = os.getenv('YOUTUBE_CLIENT_SECRET', '').strip()
         refresh_token = os.getenv('YOUTUBE_REFRESH_TOKEN', '').strip()
@@ -139,7 +159,7 @@ class YouTubeUploader:
         # Refresh to get access token
         creds.refresh(Request())
 
-        self.youtube = build('youtube', 'v3', credentials=creds)
+        self._build_client(creds)
         return True
 
     def upload_video(
@@ -180,13 +200,10 @@ class YouTubeUploader:
             title = title[:97] + "..."
 
         # Add hashtags to description for Shorts
-        hashtags = " ".join(self.DEFAULT_HASHTAGS)
-        full_description = f"{description}\n\n{hashtags}"
+        full_description = f"{description}\n\n{self.HASHTAG_LINE}"
 
-        # Prepare tags
-        all_tags = tags or []
-        all_tags.extend(["reddit", "shorts", "funny", "jokes", "comedy"])
-        all_tags = list(set(all_tags))[:500]  # YouTube limit
+        # Prepare tags: dedupe in order, without touching the caller's list
+        all_tags = list(dict.fromkeys((*(tags or ()), *self.EXTRA_TAGS)))[:500]  # YouTube limit
 
         body = {
             'snippet': {
@@ -206,7 +223,8 @@ class YouTubeUploader:
             video_path,
             mimetype='video/mp4',
             resumable=True,
-            chunksize=1024 * 1024  # 1MB chunks
+            # 8MB chunks: a Short goes up in a few requests, not dozens
+            chunksize=8 * 1024 * 1024
         )
 
         # Execute upload (notifySubscribers is a separate parameter, not part of body)
@@ -228,8 +246,9 @@ class YouTubeUploader:
                     print(f"Upload progress: {int(status.progress() * 100)}%")
             except HttpError as e:
                 if e.resp.status in [500, 502, 503, 504] and retry_count < max_retries:
+                    # Exponential backoff with jitter, as the API docs recommend
+                    sleep_time = 2 ** retry_count + random.random()
                     retry_count += 1
-                    sleep_time = random.uniform(1, 5) * retry_count
                     print(f"Server error, retrying in {sleep_time:.1f}s...")
                     time.sleep(sleep_time)
                 else:
@@ -0,0 +1,15 @@
+import numpy as np
+
+from audio_mixer import AudioMixer, _encode_av
+
+
+def test_process_video_audio_copy_keeps_source_extension(tmp_path):
+    tts_path = tmp_path / "joke.mp3"
+    _encode_av(np.zeros((4410, 1), dtype=np.int16), 44100, str(tts_path))
+
+    mixer = AudioMixer(sounds_dir=str(tmp_path / "sounds"), output_dir=str(tmp_path / "out"))
+    output = mixer.process_video_audio(str(tts_path))
+
+    # No effect and no music: the MP3 is copied, not re-encoded as WAV
+    assert output == str(tmp_path / "joke_mixed.mp3")
+    assert (tmp_path / "joke_mixed.mp3").read_bytes() == tts_path.read_bytes()
@@ -0,0 +1,11 @@
+from reddit_scraper import RedditScraper
+
+
+def test_clean_text_strips_double_escaped_zero_width_space():
+    scraper = RedditScraper()
+    assert scraper._clean_text("Why?\n\n&amp;#x200B;\n\nBecause.") == "Why?\n\nBecause."
+
+
+def test_clean_text_decodes_double_escaped_angle_brackets():
+    scraper = RedditScraper()
+    assert scraper._clean_text("I &amp;lt;3 puns &amp;gt; memes") == "I <3 puns > memes"